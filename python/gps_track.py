@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/rblankley/rpi-grove/blob/master/LICENSE
+#
+
+from array import array
+
+import calendar
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ['gps_time', 'GPS_Track']
+
+# -------------------------------------------------------------------------------------------------
+def gps_time( date, utc ):
+    """! Convert GPS date and time to POSIX time
+    @param date  date (ddmmyy)
+    @param utc  utc time (hhmmss.sss)
+    @return  seconds since epoch (UTC)
+    """
+    date = int( date )
+    day = date // 10000
+    month = (date // 100) % 100
+    year = 2000 + (date % 100)
+
+    hms = int( utc )
+    seconds = (hms // 10000) * 3600 + ((hms // 100) % 100) * 60 + (hms % 100)
+
+    return calendar.timegm( (year, month, day, 0, 0, 0) ) + seconds + (utc - hms)
+
+# =================================================================================================
+class GPS_Track( object ):
+    """! Bounded history of GPS fixes
+
+    Fixes are stored in preallocated parallel arrays used as a ring buffer. There is a single
+    writer; the fix count is published last so readers never take a lock. Times must not go
+    backwards, which allows time range lookup by binary search.
+    """
+
+    # mean earth radius (meters)
+    EARTH_RADIUS = 6371008.8
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self, size=3600 ):
+        """! Initialize Class
+        @param size  ring buffer size (in fixes)
+        """
+        if ( size < 2 ):
+            raise ValueError( 'track size must be at least 2 fixes' )
+
+        self.__size = size
+
+        # ring buffer columns
+        self.__t = array( 'd', bytes( 8 * size ) )
+        self.__lat = array( 'd', bytes( 8 * size ) )
+        self.__lon = array( 'd', bytes( 8 * size ) )
+        self.__alt = array( 'd', bytes( 8 * size ) )
+        self.__speed = array( 'd', bytes( 8 * size ) )
+
+        self.__columns = (self.__t, self.__lat, self.__lon, self.__alt, self.__speed)
+
+        self.__count = 0
+
+    # ---------------------------------------------------------------------------------------------
+    def __len__( self ):
+        """! Retrieve number of fixes held
+        @return  number of fixes
+        """
+        return min( self.__count, self.__size - 1 )
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def size( self ):
+        """! Retrieve ring buffer size
+        @return  size (in fixes)
+        """
+        return self.__size
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def count( self ):
+        """! Retrieve number of fixes appended
+        @return  fix count
+        """
+        return self.__count
+
+    # ---------------------------------------------------------------------------------------------
+    def append( self, t, latitude, longitude, altitude, speed ):
+        """! Append fix
+        @param t  time (POSIX seconds)
+        @param latitude  latitude (degrees)
+        @param longitude  longitude (degrees)
+        @param altitude  altitude (meters)
+        @param speed  speed (km/hr)
+        """
+        count = self.__count
+
+        # ignore fixes that go back in time
+        if (( count ) and ( t < self.__t[(count - 1) % self.__size] )):
+            return
+
+        slot = count % self.__size
+
+        self.__t[slot] = t
+        self.__lat[slot] = latitude
+        self.__lon[slot] = longitude
+        self.__alt[slot] = altitude
+        self.__speed[slot] = speed
+
+        # publish fix
+        self.__count = count + 1
+
+    # ---------------------------------------------------------------------------------------------
+    def clear( self ):
+        """! Discard all fixes """
+        self.__count = 0
+
+    # ---------------------------------------------------------------------------------------------
+    def __search( self, t, count, n, right ):
+        """! Binary search fixes by time
+        @param t  time to find
+        @param count  fix count
+        @param n  number of fixes held
+        @param right  @c True to find first fix after @p t, @c False for first fix at or after
+        @return  logical index (0 is oldest fix)
+        """
+        times = self.__t
+        size = self.__size
+        first = count - n
+
+        lo = 0
+        hi = n
+
+        while ( lo < hi ):
+            mid = (lo + hi) // 2
+            v = times[(first + mid) % size]
+
+            if (( v < t ) or (( right ) and ( v == t ))):
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo
+
+    # ---------------------------------------------------------------------------------------------
+    def window( self, start=None, end=None ):
+        """! Retrieve fixes by time range
+        @param start  first time (POSIX seconds), @c None for oldest fix
+        @param end  last time (POSIX seconds), @c None for newest fix
+        @return  fixes as (t, latitude, longitude, altitude, speed) arrays, oldest first
+        """
+        size = self.__size
+
+        while ( True ):
+            count = self.__count
+            n = min( count, size - 1 )
+
+            lo = 0 if ( start is None ) else self.__search( start, count, n, False )
+            hi = n if ( end is None ) else self.__search( end, count, n, True )
+
+            hi = max( lo, hi )
+
+            first = (count - n + lo) % size
+            last = (count - n + hi) % size
+
+            if ( first <= last ):
+                result = tuple( c[first:last] for c in self.__columns )
+            else:
+                result = tuple( c[first:] + c[:last] for c in self.__columns )
+
+            # retry when the writer lapped the copied fixes
+            if (( self.__count - count ) < ( size - n )):
+                return result
+
+    # ---------------------------------------------------------------------------------------------
+    def distance( self, start=None, end=None ):
+        """! Compute distance travelled by time range
+        @param start  first time (POSIX seconds), @c None for oldest fix
+        @param end  last time (POSIX seconds), @c None for newest fix
+        @return  distance (meters)
+        """
+        (t, lat, lon, alt, speed) = self.window( start, end )
+
+        return self.pathLength( lat, lon )
+
+    # ---------------------------------------------------------------------------------------------
+    def averageSpeed( self, start=None, end=None ):
+        """! Compute average speed by time range
+        @param start  first time (POSIX seconds), @c None for oldest fix
+        @param end  last time (POSIX seconds), @c None for newest fix
+        @return  speed (km/hr), @c None when range holds less than two fixes
+        """
+        (t, lat, lon, alt, speed) = self.window( start, end )
+
+        if (( len( t ) < 2 ) or ( t[-1] <= t[0] )):
+            return None
+
+        return self.pathLength( lat, lon ) / (t[-1] - t[0]) * 3.6
+
+    # ---------------------------------------------------------------------------------------------
+    @classmethod
+    def pathLength( cls, lat, lon ):
+        """! Compute great circle length of path
+        @param lat  latitudes (degrees)
+        @param lon  longitudes (degrees)
+        @return  length (meters)
+        """
+        if ( len( lat ) < 2 ):
+            return 0.0
+
+        if ( numpy is not None ):
+            lat = numpy.radians( numpy.frombuffer( lat, dtype=numpy.float64 ) )
+            lon = numpy.radians( numpy.frombuffer( lon, dtype=numpy.float64 ) )
+
+            a = numpy.sin( numpy.diff( lat ) * 0.5 ) ** 2 + numpy.cos( lat[:-1] ) * numpy.cos( lat[1:] ) * numpy.sin( numpy.diff( lon ) * 0.5 ) ** 2
+
+            return float( 2.0 * cls.EARTH_RADIUS * numpy.arcsin( numpy.sqrt( numpy.minimum( a, 1.0 ) ) ).sum() )
+
+        result = 0.0
+
+        rlat = [math.radians( v ) for v in lat]
+        rlon = [math.radians( v ) for v in lon]
+
+        for i in range( 1, len( rlat ) ):
+            a = math.sin( (rlat[i] - rlat[i - 1]) * 0.5 ) ** 2 + math.cos( rlat[i - 1] ) * math.cos( rlat[i] ) * math.sin( (rlon[i] - rlon[i - 1]) * 0.5 ) ** 2
+            result += math.asin( math.sqrt( min( a, 1.0 ) ) )
+
+        return 2.0 * cls.EARTH_RADIUS * result
+
+
+# =================================================================================================
+#
+# Test Cases
+#
+# =================================================================================================
+
+# -------------------------------------------------------------------------------------------------
+def main():
+    import time
+
+    global numpy
+
+    size = 86400
+    track = GPS_Track( size + 1 )
+
+    # one day at 1 Hz heading north at roughly 36 km/hr
+    t0 = gps_time( 260406, 0.0 )
+
+    for i in range( 0, size ):
+        track.append( t0 + i, 23.0 + i * 0.00009, 120.0, 40.0, 36.0 )
+
+    start = time.perf_counter()
+
+    for i in range( 0, 1000 ):
+        track.window( t0 + i * 60, t0 + i * 60 + 600 )
+
+    print( 'window: {0:.1f} us per 10 minute query'.format( (time.perf_counter() - start) * 1000.0 ) )
+
+    vectorized = numpy
+
+    for numpy in ((None, vectorized) if vectorized is not None else (None,)):
+        start = time.perf_counter()
+        distance = track.distance()
+        speed = track.averageSpeed()
+
+        print( '{0}: {1:.0f} m, {2:.2f} km/hr in {3:.1f} ms'.format( 'python' if numpy is None else 'numpy', distance, speed, (time.perf_counter() - start) * 1000.0 ) )
+
+    numpy = vectorized
+
+# -------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,679 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/rblankley/rpi-grove/blob/master/LICENSE
+#
+
+from collections import deque
+from gps_track import gps_time
+from threading import Thread
+
+import json
+import os
+import selectors
+import socket
+import stat
+import time
+
+__all__ = ['GPSD_Server']
+
+# =================================================================================================
+class GPSD_Server_Client( object ):
+    """! Connected client state """
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self, sock ):
+        """! Initialize Class
+        @param sock  client socket
+        """
+        self.sock = sock
+        self.rx = bytearray()
+        self.tx = bytearray()
+        self.watch = False
+        self.closed = False
+
+# =================================================================================================
+class GPSD_Server( Thread ):
+    """! Thread object that serves Grove_GPS fixes to local clients using the gpsd JSON protocol
+
+    One thread multiplexes all sockets with a selector. Each fix is encoded once, on the thread
+    that processes sentences, and the same bytes are queued to every watching client. Clients
+    that fall more than @c MAX_PENDING bytes behind are disconnected instead of slowing others.
+
+    Supported requests are ?VERSION, ?DEVICES, ?WATCH and ?POLL; watchers receive TPV and SKY
+    reports.
+    """
+
+    DEBUG = False
+
+    VERSION = {'class': 'VERSION', 'release': '3.25', 'rev': 'rpi-grove', 'proto_major': 3, 'proto_minor': 14}
+
+    # most unsent bytes held for a client
+    MAX_PENDING = 1 << 16
+
+    # fixes held while the server thread is busy
+    FIX_QUEUE_SIZE = 16
+
+    RECV_SIZE = 4096
+
+    # gpsd gnssid by talker
+    GNSS_IDS = {'GP': 0, 'GA': 2, 'GB': 3, 'GQ': 5, 'GL': 6, 'GI': 7}
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self, gps, address=('127.0.0.1', 2947), path=None, device='/dev/ttyAMA0' ):
+        """! Initialize Class
+        @param gps  grove gps
+        @param address  TCP address to listen on as (host, port), @c None for no TCP socket
+        @param path  Unix socket path to listen on, @c None for no Unix socket
+        @param device  device path reported to clients
+        """
+        super( GPSD_Server, self ).__init__()
+
+        # daemonize thread
+        self.daemon = True
+
+        if (( address is None ) and ( path is None )):
+            raise ValueError( 'no address to listen on' )
+
+        self.__gps = gps
+        self.__device = device
+        self.__path = path
+
+        self.__selector = selectors.DefaultSelector()
+        self.__servers = []
+        self.__tcp = None
+
+        if ( address is not None ):
+            self.__tcp = self.__listen( socket.AF_INET, address )
+
+        if ( path is not None ):
+            self.__unlink( path )
+            self.__listen( socket.AF_UNIX, path )
+
+        # socket pair used to wake the server thread for new fixes and stop
+        self.__wake = socket.socketpair()
+
+        for s in self.__wake:
+            s.setblocking( False )
+
+        self.__selector.register( self.__wake[0], selectors.EVENT_READ, self.__wake )
+
+        self.__pending = deque( maxlen=self.FIX_QUEUE_SIZE )
+        self.__signaled = False
+
+        self.__clients = {}
+        self.__quit = False
+
+        # fix handle of gps before start(), called after publishing
+        self.__chained = None
+
+        self.__sent = 0
+        self.__dropped = 0
+
+        self.__version = self.__encode( self.VERSION )
+
+    # ---------------------------------------------------------------------------------------------
+    def __listen( self, family, address ):
+        """! Open listening socket
+        @param family  address family
+        @param address  address
+        @return  socket
+        """
+        s = socket.socket( family, socket.SOCK_STREAM )
+
+        if ( socket.AF_INET == family ):
+            s.setsockopt( socket.SOL_SOCKET, socket.SO_REUSEADDR, 1 )
+
+        s.bind( address )
+        s.listen( 16 )
+        s.setblocking( False )
+
+        self.__selector.register( s, selectors.EVENT_READ, None )
+        self.__servers.append( s )
+
+        return s
+
+    # ---------------------------------------------------------------------------------------------
+    @staticmethod
+    def __unlink( path ):
+        """! Remove stale Unix socket; any other file is left alone, so listening fails instead
+        @param path  Unix socket path
+        """
+        try:
+            if ( stat.S_ISSOCK( os.stat( path ).st_mode ) ):
+                os.unlink( path )
+        except FileNotFoundError:
+            pass
+
+    # ---------------------------------------------------------------------------------------------
+    def __debug( self, s ):
+        """! Print debug statement
+        @param s  statement
+        """
+        if ( self.DEBUG ):
+            print( s )
+
+    # ---------------------------------------------------------------------------------------------
+    def start( self ):
+        """! Start serving fixes
+        The gps fix handle already set keeps being called after each fix is published.
+        """
+        self.__chained = self.__gps.on_fix
+        self.__gps.on_fix = self.__on_fix
+
+        super( GPSD_Server, self ).start()
+
+    # ---------------------------------------------------------------------------------------------
+    def stop( self ):
+        """! Stop thread, disconnect clients and wait for completion
+        The gps fix handle set before start() is restored, unless it was replaced since.
+        """
+        if ( self.__gps.on_fix == self.__on_fix ):
+            self.__gps.on_fix = self.__chained
+
+        self.__quit = True
+        self.__signal()
+
+        if ( self.is_alive() ):
+            self.join()
+
+        for client in list( self.__clients.values() ):
+            self.__close( client )
+
+        for s in self.__servers + list( self.__wake ):
+            s.close()
+
+        self.__selector.close()
+
+        if ( self.__path is not None ):
+            self.__unlink( self.__path )
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def address( self ):
+        """! Retrieve TCP address listened on
+        @return  address as (host, port), @c None if no TCP socket
+        """
+        return None if ( self.__tcp is None ) else self.__tcp.getsockname()
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def clients( self ):
+        """! Retrieve number of connected clients
+        @return  number of clients
+        """
+        return len( self.__clients )
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def messagesSent( self ):
+        """! Retrieve number of reports queued to watching clients
+        @return  number of reports
+        """
+        return self.__sent
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def droppedClients( self ):
+        """! Retrieve number of clients disconnected for falling behind
+        @return  number of clients
+        """
+        return self.__dropped
+
+    # ---------------------------------------------------------------------------------------------
+    def publish( self, fix ):
+        """! Publish fix to watching clients; called from the thread that processes sentences
+        @param fix  fix
+        """
+        self.__pending.append( self.__encode( self.__tpv( fix ) ) + self.__encode( self.__sky( fix ) ) )
+
+        if ( not self.__signaled ):
+            self.__signal()
+
+    # ---------------------------------------------------------------------------------------------
+    def __on_fix( self, fix ):
+        """! Gps fix handle; publish fix, then call handle it replaced
+        @param fix  fix
+        """
+        if ( not self.__quit ):
+            self.publish( fix )
+
+        handle = self.__chained
+
+        if ( handle is not None ):
+            handle( fix )
+
+    # ---------------------------------------------------------------------------------------------
+    def __signal( self ):
+        """! Wake server thread """
+        self.__signaled = True
+
+        try:
+            self.__wake[1].send( b'\0' )
+        except (BlockingIOError, OSError):
+            pass
+
+    # ---------------------------------------------------------------------------------------------
+    @staticmethod
+    def __encode( report ):
+        """! Encode report
+        @param report  report
+        @return  JSON line
+        """
+        return json.dumps( report, separators=(',', ':') ).encode( 'utf-8' ) + b'\r\n'
+
+    # ---------------------------------------------------------------------------------------------
+    @staticmethod
+    def __time( fix ):
+        """! Format fix time
+        @param fix  fix
+        @return  ISO 8601 time, @c None if date not known
+        """
+        if ( not fix.date ):
+            return None
+
+        t = gps_time( fix.date, fix.utc )
+
+        return time.strftime( '%Y-%m-%dT%H:%M:%S', time.gmtime( t ) ) + '.{0:03d}Z'.format( int( (t % 1.0) * 1000.0 ) )
+
+    # ---------------------------------------------------------------------------------------------
+    def __tpv( self, fix ):
+        """! Build TPV report
+        @param fix  fix
+        @return  report
+        """
+        report = {'class': 'TPV', 'device': self.__device, 'mode': 3 if ( fix.position ) else 1}
+
+        t = self.__time( fix )
+
+        if ( t is not None ):
+            report['time'] = t
+
+        if ( fix.position ):
+            report['lat'] = fix.latitude
+            report['lon'] = fix.longitude
+            report['alt'] = fix.altitude
+            report['altMSL'] = fix.altitude
+            report['geoidSep'] = fix.geoids
+            report['track'] = fix.heading
+            report['speed'] = fix.velocity / 3.6
+
+        return report
+
+    # ---------------------------------------------------------------------------------------------
+    def __sky( self, fix ):
+        """! Build SKY report
+        @param fix  fix
+        @return  report
+        """
+        used = frozenset( fix.used )
+        satellites = []
+
+        for (key, (elevation, azinmuth, snr)) in fix.info.items():
+            (talker, prn) = key
+            satellite = {'PRN': prn, 'used': key in used}
+
+            gnssid = self.GNSS_IDS.get( talker )
+
+            if ( gnssid is not None ):
+                satellite['gnssid'] = gnssid
+
+            if ( elevation is not None ):
+                satellite['el'] = elevation
+            if ( azinmuth is not None ):
+                satellite['az'] = azinmuth
+            if ( snr is not None ):
+                satellite['ss'] = snr
+
+            satellites.append( satellite )
+
+        return {'class': 'SKY', 'device': self.__device, 'hdop': fix.hdop, 'pdop': fix.pdop, 'vdop': fix.vdop, 'satellites': satellites}
+
+    # ---------------------------------------------------------------------------------------------
+    def __devices( self ):
+        """! Build DEVICES report
+        @return  report
+        """
+        return {'class': 'DEVICES', 'devices': [{'class': 'DEVICE', 'path': self.__device, 'driver': 'NMEA0183', 'activated': 1}]}
+
+    # ---------------------------------------------------------------------------------------------
+    def __close( self, client ):
+        """! Disconnect client
+        @param client  client
+        """
+        if ( client.closed ):
+            return
+
+        client.closed = True
+
+        try:
+            self.__selector.unregister( client.sock )
+        except (KeyError, ValueError):
+            pass
+
+        client.sock.close()
+        self.__clients.pop( client.sock, None )
+
+    # ---------------------------------------------------------------------------------------------
+    def __send( self, client, data ):
+        """! Send data to client, queueing what the socket does not take
+        @param client  client
+        @param data  data
+        """
+        if ( client.closed ):
+            return
+
+        if ( not client.tx ):
+            try:
+                n = client.sock.send( data )
+            except BlockingIOError:
+                n = 0
+            except OSError:
+                self.__close( client )
+                return
+
+            if ( len( data ) == n ):
+                return
+
+            data = data[n:]
+
+            self.__selector.modify( client.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, client )
+
+        # slow client
+        if ( self.MAX_PENDING < ( len( client.tx ) + len( data ) ) ):
+            self.__debug( 'Dropping slow client' )
+            self.__dropped += 1
+            self.__close( client )
+            return
+
+        client.tx += data
+
+    # ---------------------------------------------------------------------------------------------
+    def __flush( self, client ):
+        """! Send queued data to client
+        @param client  client
+        """
+        try:
+            n = client.sock.send( client.tx )
+        except BlockingIOError:
+            return
+        except OSError:
+            self.__close( client )
+            return
+
+        del client.tx[:n]
+
+        if ( not client.tx ):
+            self.__selector.modify( client.sock, selectors.EVENT_READ, client )
+
+    # ---------------------------------------------------------------------------------------------
+    def __accept( self, server ):
+        """! Accept client connection
+        @param server  listening socket
+        """
+        try:
+            (sock, address) = server.accept()
+        except (BlockingIOError, OSError):
+            return
+
+        sock.setblocking( False )
+
+        client = GPSD_Server_Client( sock )
+
+        self.__clients[sock] = client
+        self.__selector.register( sock, selectors.EVENT_READ, client )
+
+        self.__send( client, self.__version )
+
+    # ---------------------------------------------------------------------------------------------
+    def __request( self, client, request ):
+        """! Process client request
+        @param client  client
+        @param request  request without terminator
+        """
+        (command, sep, args) = request.partition( '=' )
+
+        if ( '?VERSION' == command ):
+            self.__send( client, self.__version )
+
+        elif ( '?DEVICES' == command ):
+            self.__send( client, self.__encode( self.__devices() ) )
+
+        elif ( '?WATCH' == command ):
+            try:
+                params = json.loads( args ) if ( args ) else {}
+            except ValueError:
+                params = None
+
+            if ( not isinstance( params, dict ) ):
+                self.__send( client, self.__encode( {'class': 'ERROR', 'message': "Invalid WATCH: {0}".format( args )} ) )
+                return
+
+            enable = bool( params.get( 'enable', True ) )
+            encoding = bool( params.get( 'json', enable ) )
+
+            client.watch = enable and encoding
+
+            self.__send( client, self.__encode( self.__devices() ) + self.__encode( {'class': 'WATCH', 'enable': enable, 'json': encoding} ) )
+
+        elif ( '?POLL' == command ):
+            fix = self.__gps.fix()
+
+            report = {'class': 'POLL', 'active': 1, 'tpv': [self.__tpv( fix )], 'sky': [self.__sky( fix )]}
+
+            t = self.__time( fix )
+
+            if ( t is not None ):
+                report['time'] = t
+
+            self.__send( client, self.__encode( report ) )
+
+        else:
+            self.__send( client, self.__encode( {'class': 'ERROR', 'message': "Unrecognized request '{0}'".format( command )} ) )
+
+    # ---------------------------------------------------------------------------------------------
+    def __read( self, client ):
+        """! Read client requests
+        @param client  client
+        """
+        try:
+            data = client.sock.recv( self.RECV_SIZE )
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+
+        if ( not data ):
+            self.__close( client )
+            return
+
+        client.rx += data
+
+        rx = client.rx
+        start = 0
+
+        # requests end with ';' or a line feed; each terminator is searched for again only once
+        # passed, so the buffer is scanned once
+        semicolon = rx.find( b';' )
+        linefeed = rx.find( b'\n' )
+
+        while ( not client.closed ):
+            if ( 0 <= semicolon < start ):
+                semicolon = rx.find( b';', start )
+            if ( 0 <= linefeed < start ):
+                linefeed = rx.find( b'\n', start )
+
+            if ( semicolon < 0 ):
+                end = linefeed
+            elif ( linefeed < 0 ):
+                end = semicolon
+            else:
+                end = min( semicolon, linefeed )
+
+            if ( end < 0 ):
+                break
+
+            request = str( rx[start:end], 'utf-8', 'replace' ).strip()
+            start = end + 1
+
+            if ( request ):
+                self.__request( client, request )
+
+        # drop consumed requests; bytearray trims the front without moving the rest
+        del rx[:start]
+
+        # requests are short; drop clients sending garbage
+        if ( self.RECV_SIZE < len( client.rx ) ):
+            self.__close( client )
+
+    # ---------------------------------------------------------------------------------------------
+    def __broadcast( self ):
+        """! Send pending fixes to watching clients """
+        while ( True ):
+            try:
+                data = self.__wake[0].recv( self.RECV_SIZE )
+            except (BlockingIOError, OSError):
+                break
+
+            if ( not data ):
+                break
+
+        self.__signaled = False
+
+        pending = self.__pending
+
+        while ( pending ):
+            data = pending.popleft()
+
+            for client in list( self.__clients.values() ):
+                if ( client.watch ):
+                    self.__send( client, data )
+                    self.__sent += 1
+
+    # ---------------------------------------------------------------------------------------------
+    def run( self ):
+        """! Thread run method """
+        while ( not self.__quit ):
+            for (key, mask) in self.__selector.select():
+                if ( key.data is self.__wake ):
+                    self.__broadcast()
+
+                elif ( key.data is None ):
+                    self.__accept( key.fileobj )
+
+                else:
+                    client = key.data
+
+                    if (( mask & selectors.EVENT_READ ) and ( not client.closed )):
+                        self.__read( client )
+
+                    if (( mask & selectors.EVENT_WRITE ) and ( not client.closed )):
+                        self.__flush( client )
+
+
+# =================================================================================================
+#
+# Test Cases
+#
+# =================================================================================================
+
+# -------------------------------------------------------------------------------------------------
+def main():
+    from grove_gps_module import Grove_GPS
+    from nmea_parser import nmea_checksum
+
+    import pty
+    import sys
+    import threading
+
+    clients = int( sys.argv[1] ) if ( 1 < len( sys.argv ) ) else 32
+    epochs = int( sys.argv[2] ) if ( 2 < len( sys.argv ) ) else 2000
+
+    def sentence( body ):
+        return '${0}*{1:02X}\r\n'.format( body, nmea_checksum( body.encode( 'ascii' ) ) ).encode( 'ascii' )
+
+    # fake receiver
+    (master, slave) = pty.openpty()
+    device = os.ttyname( slave )
+
+    gps = Grove_GPS( device, 115200 )
+    server = GPSD_Server( gps, ('127.0.0.1', 0), device=device )
+    server.start()
+
+    # watching clients
+    socks = []
+
+    for i in range( 0, clients ):
+        s = socket.create_connection( server.address )
+        s.sendall( b'?WATCH={"enable":true,"json":true};\n' )
+        socks.append( s )
+
+    time.sleep( 0.2 )
+
+    received = dict( (s, 0) for s in socks )
+    done = threading.Event()
+
+    def read():
+        selector = selectors.DefaultSelector()
+
+        for s in socks:
+            s.setblocking( False )
+            selector.register( s, selectors.EVENT_READ )
+
+        while ( not done.is_set() ):
+            for (key, mask) in selector.select( 0.1 ):
+                try:
+                    data = key.fileobj.recv( 1 << 16 )
+                except BlockingIOError:
+                    continue
+
+                received[key.fileobj] += data.count( b'"class":"TPV"' )
+
+        selector.close()
+
+    reader = Thread( target=read )
+    reader.start()
+
+    start = time.perf_counter()
+
+    for i in range( 0, epochs ):
+        utc = '{0:02d}{1:02d}{2:02d}.000'.format( (i // 3600) % 24, (i // 60) % 60, i % 60 )
+        lat = '{0:09.4f}'.format( 2307.1256 + (i % 1000) * 0.001 )
+
+        os.write( master,
+            sentence( 'GPRMC,{0},A,{1},N,12016.4438,E,0.03,165.48,260406,3.05,W,A'.format( utc, lat ) ) +
+            sentence( 'GPGGA,{0},{1},N,12016.4438,E,1,8,0.95,39.9,M,17.8,M,,'.format( utc, lat ) ) +
+            sentence( 'GPGSA,A,3,29,21,26,15,18,09,06,10,,,,,2.32,0.95,2.11' ) )
+
+        # pace like a fast receiver so the serial line queue does not drop sentences
+        if ( 0 == ( i % 10 ) ):
+            time.sleep( 0.005 )
+
+    # wait for delivery to finish
+    total = -1
+    elapsed = 0.0
+
+    while ( total < sum( received.values() ) ):
+        total = sum( received.values() )
+        elapsed = time.perf_counter() - start
+
+        time.sleep( 0.5 )
+
+    done.set()
+    reader.join()
+
+    total = sum( received.values() )
+
+    print( '{0} clients, {1} epochs: {2} TPV reports in {3:.2f} s ({4:.0f} reports/s), per client min {5} max {6}, {7} dropped clients'.format(
+        clients, epochs, total, elapsed, total / elapsed, min( received.values() ), max( received.values() ), server.droppedClients ) )
+
+    for s in socks:
+        s.close()
+
+    server.stop()
+    del gps
+
+# -------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    main()
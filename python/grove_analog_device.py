@@ -5,7 +5,21 @@
 # For more information see https://github.com/rblankley/rpi-grove/blob/master/LICENSE
 #
 
-__all__ = ['Grove_Analog_Device']
+from collections import deque
+from enum import Enum
+
+import statistics
+import time
+
+__all__ = ['Grove_Analog_Oversampling_Mode', 'Grove_Analog_Device']
+
+# =================================================================================================
+class Grove_Analog_Oversampling_Mode( Enum ):
+    """! Grove Analog Oversampling Modes
+    AVERAGE and MEDIAN decimate (one value per @c n reads); MOVING_AVERAGE and EMA filter (one
+    value per read).
+    """
+    NONE, AVERAGE, MEDIAN, MOVING_AVERAGE, EMA = range( 0, 5 )
 
 # =================================================================================================
 class Grove_Analog_Device( object ):
@@ -20,9 +34,138 @@ class Grove_Analog_Device( object ):
         self.__dev = dev
         self.__port = port
 
+        # devices other than the base hat have no channel handles or background sampler
+        if ( hasattr( dev, 'analogChannel' ) ):
+            channel = dev.analogChannel( port )
+
+            self.__read = channel.read
+            self.__read_type = channel.readType
+        else:
+            self.__read = lambda: dev.analogRead( port )
+            self.__read_type = None
+
+        self.setOversampling( Grove_Analog_Oversampling_Mode.NONE )
+
+    # ---------------------------------------------------------------------------------------------
+    def __sample( self ):
+        """! Read single sample
+        Reads the latest background sample when the device is sampling this port.
+        @return  value
+        """
+        sampler = getattr( self.__dev, 'sampler', None )
+
+        if (( sampler is not None ) and ( self.__read_type == sampler.readType )):
+            value = sampler.latest( self.__port )
+
+            if ( value is not None ):
+                return value
+
+        start = time.perf_counter()
+        value = self.__read()
+        self.__bus_time += time.perf_counter() - start
+
+        return value
+
+    # ---------------------------------------------------------------------------------------------
+    def __samples( self ):
+        """! Read oversampling samples
+        @return  values
+        """
+        dev = self.__dev
+        n = self.__n
+
+        # served from the background sampler window, no bus access
+        if ( hasattr( dev, 'analogSampled' ) ):
+            values = dev.analogSampled( self.__port, n, self.__read_type )
+
+            if ( values is not None ):
+                return values
+
+        start = time.perf_counter()
+
+        if ( hasattr( dev, 'analogReadMany' ) ):
+            values = dev.analogReadMany( self.__port, n, self.__read_type, sampled=False )
+        else:
+            values = [self.__read() for i in range( 0, n )]
+
+        self.__bus_time += time.perf_counter() - start
+
+        return values
+
+    # ---------------------------------------------------------------------------------------------
+    def setOversampling( self, mode, n=4, alpha=0.25 ):
+        """! Set oversampling mode
+        @param mode  oversampling mode, where
+                     @c Grove_Analog_Oversampling_Mode.NONE is read a single value
+                     @c Grove_Analog_Oversampling_Mode.AVERAGE is read @p n values and average them
+                     @c Grove_Analog_Oversampling_Mode.MEDIAN is read @p n values and take the median
+                     @c Grove_Analog_Oversampling_Mode.MOVING_AVERAGE is read a single value and average the last @p n values (filter)
+                     @c Grove_Analog_Oversampling_Mode.EMA is read a single value into an exponential moving average (filter)
+        @param n  number of samples
+        @param alpha  exponential moving average smoothing factor (0.0, 1.0]
+        """
+        if ( n < 1 ):
+            raise ValueError( 'number of samples must be at least 1' )
+
+        if (( alpha <= 0.0 ) or ( 1.0 < alpha )):
+            raise ValueError( 'smoothing factor must be in (0.0, 1.0]' )
+
+        self.__mode = mode
+        self.__n = n
+        self.__alpha = alpha
+
+        self.__window = deque( maxlen=n )
+        self.__ema = None
+
+        # statistics
+        self.__started = time.monotonic()
+        self.__outputs = 0
+        self.__bus_time = 0.0
+
+    # ---------------------------------------------------------------------------------------------
+    def oversamplingStatistics( self ):
+        """! Retrieve oversampling statistics since oversampling mode was set
+        @return  statistics as (effective sample rate (in Hz), bus time spent (in s))
+        """
+        elapsed = time.monotonic() - self.__started
+
+        if ( 0.0 < elapsed ):
+            rate = self.__outputs / elapsed
+        else:
+            rate = 0.0
+
+        return (rate, self.__bus_time)
+
     # ---------------------------------------------------------------------------------------------
     def read( self ):
         """! Read Device
         @return  value
         """
-        return self.__dev.analogRead( self.__port )
+        mode = self.__mode
+
+        if ( Grove_Analog_Oversampling_Mode.NONE == mode ):
+            value = self.__sample()
+
+        elif ( Grove_Analog_Oversampling_Mode.AVERAGE == mode ):
+            values = self.__samples()
+            value = sum( values ) / len( values )
+
+        elif ( Grove_Analog_Oversampling_Mode.MEDIAN == mode ):
+            value = statistics.median( self.__samples() )
+
+        elif ( Grove_Analog_Oversampling_Mode.MOVING_AVERAGE == mode ):
+            self.__window.append( self.__sample() )
+            value = sum( self.__window ) / len( self.__window )
+
+        else:
+            sample = self.__sample()
+
+            if ( self.__ema is None ):
+                self.__ema = float( sample )
+            else:
+                self.__ema += self.__alpha * (sample - self.__ema)
+
+            value = self.__ema
+
+        self.__outputs += 1
+        return value
@@ -5,13 +5,26 @@
 # For more information see https://github.com/rblankley/rpi-grove/blob/master/LICENSE
 #
 
+from array import array
 from enum import Enum
-from i2c_device import I2C_Device
+from types import MappingProxyType
+from i2c_device import I2C_Device, I2C_Transaction_Priority
 
+from grove_base_hat_sampler import Grove_Base_Hat_Sampler
 from grove_ports import Grove_Analog_Port, Grove_Digital_Port, Grove_Digital_Port_Direction
-from rpi_gpio_device import GPIO_Device
+from rpi_gpio_device import GPIO_Device, GPIO_Port_Group
 
-__all__ = ['Grove_Base_Hat_Device_Type', 'Grove_Base_Hat_Analog_Read_Type', 'Grove_Base_Hat_Device']
+import functools
+import math
+import struct
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ['Grove_Base_Hat_Device_Type', 'Grove_Base_Hat_Analog_Read_Type', 'Grove_Base_Hat_Analog_Channel', 'Grove_Base_Hat_Digital_Channel', 'Grove_Base_Hat_Device']
 
 # =================================================================================================
 class Grove_Base_Hat_Device_Type( Enum ):
@@ -23,6 +36,46 @@ class Grove_Base_Hat_Analog_Read_Type( Enum ):
     """! Grove Base Hat Analog Read Types """
     RAW, VOLTAGE, VALUE = range( 0, 3 )
 
+# =================================================================================================
+class Grove_Base_Hat_Analog_Channel( object ):
+    """! Grove Base Hat analog channel with port, read type and register resolved once
+
+    read() is bound to the register and calls the i2c device directly.
+    """
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self, dev, port, rt, reg ):
+        """! Initialize Class
+        @param dev  i2c device
+        @param port  analog port
+        @param rt  read type
+        @param reg  register address
+        """
+        self.port = port
+        self.readType = rt
+        self.register = reg
+
+        self.read = functools.partial( dev.readWordData, reg )
+
+# =================================================================================================
+class Grove_Base_Hat_Digital_Channel( object ):
+    """! Grove Base Hat digital channel with port and pin resolved once
+
+    read() and write( value ) are bound to the pin and call RPi.GPIO directly.
+    """
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self, dev, port ):
+        """! Initialize Class
+        @param dev  gpio device
+        @param port  digital port
+        """
+        self.port = port
+        self.pin = dev.pin
+
+        self.read = dev.readHandle()
+        self.write = dev.writeHandle()
+
 # =================================================================================================
 class Grove_Base_Hat_Device( object ):
     """! Seeed Studio Grove Base Hat """
@@ -39,52 +92,76 @@ class Grove_Base_Hat_Device( object ):
     REG_VOLTAGE_BASE = 0x20
     REG_VALUE_BASE = 0x30
 
+    ANALOG_CHANNELS = 8
+
+    ADC_MAX = 4095
+
+    # all channels as 16-bit little endian words
+    ANALOG_BLOCK = struct.Struct( '<{0}H'.format( ANALOG_CHANNELS ) )
+
     RPI_HAT_PIDS = {
         4: (Grove_Base_Hat_Device_Type.RPI_HAT, 'Grove Base Hat RPi'),
         5: (Grove_Base_Hat_Device_Type.RPI_ZERO_HAT, 'Grove Base Hat RPi Zero'),
     }
 
-    ANALOG_PORTS = {}
-    DIGITAL_PORTS = {}
-
     ANALOG_READ_BASE = {
         Grove_Base_Hat_Analog_Read_Type.RAW: REG_RAW_BASE,
         Grove_Base_Hat_Analog_Read_Type.VOLTAGE: REG_VOLTAGE_BASE,
         Grove_Base_Hat_Analog_Read_Type.VALUE: REG_VALUE_BASE,
     }
 
-    DIGITAL_DEVICES = {}
+    # available ports as (analog ports, digital ports) by device type
+    HAT_PORTS = {
+        Grove_Base_Hat_Device_Type.RPI_ZERO_HAT: (
+            (Grove_Analog_Port.A0, Grove_Analog_Port.A2, Grove_Analog_Port.A4),
+            (Grove_Digital_Port.D5, Grove_Digital_Port.D16),
+        ),
+        Grove_Base_Hat_Device_Type.RPI_HAT: (
+            (Grove_Analog_Port.A0, Grove_Analog_Port.A2, Grove_Analog_Port.A4, Grove_Analog_Port.A6),
+            (Grove_Digital_Port.D5, Grove_Digital_Port.D16, Grove_Digital_Port.D18, Grove_Digital_Port.D22, Grove_Digital_Port.D24, Grove_Digital_Port.D26),
+        ),
+    }
 
     # ---------------------------------------------------------------------------------------------
     def __init__( self ):
         """! Initialize Class """
 
-        # setup device
-        self.__dev = I2C_Device( self.I2C_ADDRESS )
+        # setup device; sensor sampling goes ahead of other bus users
+        self.__dev = I2C_Device( self.I2C_ADDRESS, priority=I2C_Transaction_Priority.HIGH )
+
+        self.__sampler = None
+
+        # identity never changes; probe once
+        self.__device_type = self.RPI_HAT_PIDS[self.__read_register( self.REG_TYPE )]
+        self.__version = self.__read_register( self.REG_VERSION )
 
         # setup ports
-        (dt, desc) = self.deviceType
+        (dt, desc) = self.__device_type
+        (analog_ports, digital_ports) = self.HAT_PORTS[dt]
+
+        # channel and pin numbers match port numbers on the hat
+        self.ANALOG_PORTS = MappingProxyType( dict( (port, port.value) for port in analog_ports ) )
+        self.DIGITAL_PORTS = MappingProxyType( dict( (port, port.value) for port in digital_ports ) )
 
-        if ( Grove_Base_Hat_Device_Type.RPI_ZERO_HAT == dt ):
-            self.ANALOG_PORTS[Grove_Analog_Port.A0] = 0
-            self.ANALOG_PORTS[Grove_Analog_Port.A2] = 2
-            self.ANALOG_PORTS[Grove_Analog_Port.A4] = 4
+        # lookup tables indexed by port value
+        self.__analog_base = tuple( self.ANALOG_READ_BASE[rt] for rt in Grove_Base_Hat_Analog_Read_Type )
 
-            self.DIGITAL_PORTS[Grove_Digital_Port.D5] = 5
-            self.DIGITAL_PORTS[Grove_Digital_Port.D16] = 16
+        analog_channels = [None] * len( Grove_Analog_Port )
 
-        elif ( Grove_Base_Hat_Device_Type.RPI_HAT == dt ):
-            self.ANALOG_PORTS[Grove_Analog_Port.A0] = 0
-            self.ANALOG_PORTS[Grove_Analog_Port.A2] = 2
-            self.ANALOG_PORTS[Grove_Analog_Port.A4] = 4
-            self.ANALOG_PORTS[Grove_Analog_Port.A6] = 6
+        for (port, channel) in self.ANALOG_PORTS.items():
+            analog_channels[port.value] = channel
 
-            self.DIGITAL_PORTS[Grove_Digital_Port.D5] = 5
-            self.DIGITAL_PORTS[Grove_Digital_Port.D16] = 16
-            self.DIGITAL_PORTS[Grove_Digital_Port.D18] = 18
-            self.DIGITAL_PORTS[Grove_Digital_Port.D22] = 22
-            self.DIGITAL_PORTS[Grove_Digital_Port.D24] = 24
-            self.DIGITAL_PORTS[Grove_Digital_Port.D26] = 26
+        self.__analog_regs = tuple(
+            tuple( None if channel is None else base + channel for channel in analog_channels ) for base in self.__analog_base
+        )
+
+        digital_pins = [None] * len( Grove_Digital_Port )
+
+        for (port, pin) in self.DIGITAL_PORTS.items():
+            digital_pins[port.value] = pin
+
+        self.__digital_pins = tuple( digital_pins )
+        self.__digital_devices = [None] * len( Grove_Digital_Port )
 
     # ---------------------------------------------------------------------------------------------
     def __read_register( self, reg ):
@@ -103,18 +180,20 @@ class Grove_Base_Hat_Device( object ):
 
     # ---------------------------------------------------------------------------------------------
     def __digital_device( self, port, direction ):
-        """! Retrieve digital device for pin
+        """! Create digital device for pin
         @param port  grove digital port
         @param direction  grove digital port direction
-        @return  device as (port, device)
+        @return  device
         """
-        pin = self.DIGITAL_PORTS[port]
+        pin = self.__digital_pins[port.value]
 
-        # create device if not yet exist
-        if ( pin not in self.DIGITAL_DEVICES.keys() ):
-            self.DIGITAL_DEVICES[pin] = ( port, GPIO_Device( pin, direction ) )
+        if ( pin is None ):
+            raise KeyError( port )
 
-        return self.DIGITAL_DEVICES[pin]
+        dev = GPIO_Device( pin, direction )
+        self.__digital_devices[port.value] = dev
+
+        return dev
 
     # ---------------------------------------------------------------------------------------------
     @property
@@ -122,8 +201,7 @@ class Grove_Base_Hat_Device( object ):
         """! Retrieve device type
         @return  device type as (type, text description)
         """
-        id = self.__read_register( self.REG_TYPE )
-        return self.RPI_HAT_PIDS[id]
+        return self.__device_type
 
     # ---------------------------------------------------------------------------------------------
     @property
@@ -140,7 +218,7 @@ class Grove_Base_Hat_Device( object ):
         """! Retrieve version
         @return  version
         """
-        return self.__read_register( self.REG_VERSION )
+        return self.__version
 
     # ---------------------------------------------------------------------------------------------
     def analogRead( self, port, rt=Grove_Base_Hat_Analog_Read_Type.VALUE ):
@@ -152,7 +230,195 @@ class Grove_Base_Hat_Device( object ):
                    @c Grove_Base_Hat_Analog_Read_Type.VALUE is read voltage ratio as percentage in 0.1%
         @return  value
         """
-        return self.__read_register( self.ANALOG_READ_BASE[rt] + self.ANALOG_PORTS[port] )
+        reg = self.__analog_regs[rt.value][port.value]
+
+        if ( reg is None ):
+            raise KeyError( port )
+
+        return self.__read_register( reg )
+
+    # ---------------------------------------------------------------------------------------------
+    def analogChannel( self, port, rt=Grove_Base_Hat_Analog_Read_Type.VALUE ):
+        """! Retrieve analog channel handle
+        @param port  port to read
+        @param rt  read type to perform (see analogRead())
+        @return  channel
+        """
+        reg = self.__analog_regs[rt.value][port.value]
+
+        if ( reg is None ):
+            raise KeyError( port )
+
+        return Grove_Base_Hat_Analog_Channel( self.__dev, port, rt, reg )
+
+    # ---------------------------------------------------------------------------------------------
+    def analogReadAll( self, rt=Grove_Base_Hat_Analog_Read_Type.VALUE ):
+        """! Perform analog read of all channels in a single transaction
+        @param rt  read type to perform (see analogRead())
+        @return  tuple of values indexed by analog port value
+        """
+        data = self.__dev.readBlockData( self.__analog_base[rt.value], self.ANALOG_BLOCK.size )
+        return self.ANALOG_BLOCK.unpack( bytes( data ) )
+
+    # ---------------------------------------------------------------------------------------------
+    def analogSampled( self, port, count, rt=Grove_Base_Hat_Analog_Read_Type.VALUE ):
+        """! Retrieve most recent background samples of a port, without bus access
+        @param port  port to read
+        @param count  number of samples
+        @param rt  read type to perform (see analogRead())
+        @return  array of values, oldest first; @c None unless the sampler holds @p count samples
+                 of the port with the same read type
+        """
+        sampler = self.__sampler
+
+        if (( sampler is None ) or ( rt != sampler.readType ) or ( not sampler.sampling( port ) ) or ( min( sampler.count, sampler.capacity ) < count )):
+            return None
+
+        (timestamps, values) = sampler.window( count )
+        return values[port.value::self.ANALOG_CHANNELS]
+
+    # ---------------------------------------------------------------------------------------------
+    def analogReadMany( self, port, count, rt=Grove_Base_Hat_Analog_Read_Type.VALUE, sampled=True ):
+        """! Perform several analog reads of a port
+        Uses the background sampler when it can serve all reads (see analogSampled()), otherwise
+        reads @p count values in a single bus transaction.
+        @param port  port to read
+        @param count  number of reads
+        @param rt  read type to perform (see analogRead())
+        @param sampled  @c False to always read the bus
+        @return  array of values, oldest first
+        """
+        if ( sampled ):
+            values = self.analogSampled( port, count, rt )
+
+            if ( values is not None ):
+                return values
+
+        reg = self.__analog_regs[rt.value][port.value]
+
+        if ( reg is None ):
+            raise KeyError( port )
+
+        with self.__dev.transaction():
+            return array( 'H', [self.__read_register( reg ) for i in range( 0, count )] )
+
+    # ---------------------------------------------------------------------------------------------
+    def analogBlock( self, count, rt=Grove_Base_Hat_Analog_Read_Type.RAW ):
+        """! Retrieve block of samples of all channels
+        Uses the background sampler when sampling with the same read type, otherwise reads
+        @p count samples in a single bus transaction.
+        @param count  number of samples
+        @param rt  read type to perform (see analogRead())
+        @return  samples as (timestamps, values) where timestamps holds monotonic times (in s) and
+                 values holds rows of samples by channel; NumPy arrays of shape (n,) and
+                 (n, channels) when NumPy is available, otherwise an array and a list of tuples
+        """
+        channels = self.ANALOG_CHANNELS
+        sampler = self.__sampler
+
+        if (( sampler is not None ) and ( rt == sampler.readType )):
+            (timestamps, values) = sampler.window( count )
+
+        else:
+            timestamps = array( 'd' )
+            values = array( 'H' )
+
+            with self.__dev.transaction():
+                for i in range( 0, count ):
+                    values.extend( self.analogReadAll( rt ) )
+                    timestamps.append( time.monotonic() )
+
+        if ( numpy is not None ):
+            return (numpy.frombuffer( timestamps, dtype=numpy.float64 ), numpy.frombuffer( values, dtype=numpy.uint16 ).reshape( -1, channels ))
+
+        return (timestamps, [tuple( values[i:i + channels] ) for i in range( 0, len( values ), channels )])
+
+    # ---------------------------------------------------------------------------------------------
+    def analogConvert( self, samples ):
+        """! Convert raw samples to voltage and ratio
+        @param samples  raw adc values as rows of samples by channel (see analogBlock())
+        @return  converted samples as (voltage (in mV), ratio (in 0.1%))
+        """
+        supply = self.powerSupplyVoltage * 1000.0
+
+        mv_scale = supply / self.ADC_MAX
+        ratio_scale = 1000.0 / self.ADC_MAX
+
+        if ( numpy is not None ):
+            raw = numpy.asarray( samples, dtype=numpy.float64 )
+            return (raw * mv_scale, raw * ratio_scale)
+
+        voltage = [tuple( v * mv_scale for v in row ) for row in samples]
+        ratio = [tuple( v * ratio_scale for v in row ) for row in samples]
+
+        return (voltage, ratio)
+
+    # ---------------------------------------------------------------------------------------------
+    def analogStatistics( self, samples ):
+        """! Compute per channel statistics
+        @param samples  rows of samples by channel (see analogBlock())
+        @return  statistics as (mean, min, max, standard deviation), each indexed by channel; @c None
+                 if there are no samples (e.g. the sampler has not taken any yet)
+        """
+        if ( not len( samples ) ):
+            return None
+
+        if ( numpy is not None ):
+            values = numpy.asarray( samples, dtype=numpy.float64 )
+            return (values.mean( axis=0 ), values.min( axis=0 ), values.max( axis=0 ), values.std( axis=0 ))
+
+        means = []
+        mins = []
+        maxs = []
+        stddevs = []
+
+        for column in zip( *samples ):
+            n = len( column )
+            mean = math.fsum( column ) / n
+
+            means.append( mean )
+            mins.append( min( column ) )
+            maxs.append( max( column ) )
+            stddevs.append( math.sqrt( math.fsum( (v - mean) ** 2 for v in column ) / n ) )
+
+        return (means, mins, maxs, stddevs)
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def sampler( self ):
+        """! Retrieve background sampler
+        @return  sampler, @c None if not sampling
+        """
+        return self.__sampler
+
+    # ---------------------------------------------------------------------------------------------
+    def startSampler( self, rate, ports=None, size=1024, rt=Grove_Base_Hat_Analog_Read_Type.VALUE ):
+        """! Start sampling analog ports in the background
+        @param rate  sample rate (in Hz)
+        @param ports  analog ports to sample, @c None for all ports
+        @param size  ring buffer size (in samples)
+        @param rt  read type to perform (see analogRead())
+        @return  sampler
+        """
+        self.stopSampler()
+
+        if ( ports is None ):
+            ports = self.ANALOG_PORTS.keys()
+
+        sampler = Grove_Base_Hat_Sampler( self, ports, rt, rate, size )
+        sampler.start()
+
+        self.__sampler = sampler
+        return sampler
+
+    # ---------------------------------------------------------------------------------------------
+    def stopSampler( self ):
+        """! Stop background sampling """
+        sampler = self.__sampler
+
+        if ( sampler is not None ):
+            self.__sampler = None
+            sampler.stop()
 
     # ---------------------------------------------------------------------------------------------
     def digitalRead( self, port ):
@@ -179,5 +445,170 @@ class Grove_Base_Hat_Device( object ):
         @param direction  grove digital port direction
         @return  device
         """
-        (pin, dev) = self.__digital_device( port, direction )
+        dev = self.__digital_devices[port.value]
+
+        # create device if not yet exist
+        if ( dev is None ):
+            dev = self.__digital_device( port, direction )
+
         return dev
+
+    # ---------------------------------------------------------------------------------------------
+    def digitalChannel( self, port, direction ):
+        """! Retrieve digital channel handle
+        @param port  grove digital port
+        @param direction  grove digital port direction
+        @return  channel
+        """
+        return Grove_Base_Hat_Digital_Channel( self.gpio( port, direction ), port )
+
+    # ---------------------------------------------------------------------------------------------
+    def gpioGroup( self, ports, direction, backend=None ):
+        """! Retrieve gpio group for pins
+        @param ports  grove digital ports, bit @c i of group masks is @c ports[i]
+        @param direction  grove digital port direction
+        @param backend  gpio backend, @c None for RPi.GPIO
+        @return  group
+        """
+        pins = []
+
+        for port in ports:
+            pin = self.__digital_pins[port.value]
+
+            if ( pin is None ):
+                raise KeyError( port )
+
+            pins.append( pin )
+
+        return GPIO_Port_Group( pins, direction, backend )
+
+
+# =================================================================================================
+#
+# Test Cases
+#
+# =================================================================================================
+
+# -------------------------------------------------------------------------------------------------
+def main():
+    from i2c_device import I2C_Bus_Pool, I2C_Simulated_Bus
+
+    import timeit
+
+    address = Grove_Base_Hat_Device.I2C_ADDRESS
+    buses = []
+
+    # fake bus reporting a Grove Base Hat RPi with distinct 16-bit values on every channel
+    def factory( bus ):
+        sim = I2C_Simulated_Bus( bus )
+        sim.regs[(address, Grove_Base_Hat_Device.REG_TYPE)] = 4
+
+        for base in Grove_Base_Hat_Device.ANALOG_READ_BASE.values():
+            for channel in range( 0, Grove_Base_Hat_Device.ANALOG_CHANNELS ):
+                sim.write_word_data( address, base + channel, base * 100 + channel * 257 + 1 )
+
+        buses.append( sim )
+        return sim
+
+    I2C_Bus_Pool.factory = factory
+
+    dev = Grove_Base_Hat_Device()
+    sim = buses[0]
+
+    # block read decodes the same values as per channel reads
+    for rt in Grove_Base_Hat_Analog_Read_Type:
+        values = dev.analogReadAll( rt )
+
+        for port in dev.ANALOG_PORTS:
+            assert values[port.value] == dev.analogRead( port, rt ), (rt, port)
+
+    print( 'analogReadAll: matches analogRead on {0} ports'.format( len( dev.ANALOG_PORTS ) ) )
+
+    # analog devices read the same values from the bus and from the background sampler
+    from grove_analog_device import Grove_Analog_Device
+
+    devices = [Grove_Analog_Device( dev, port ) for port in dev.ANALOG_PORTS]
+    direct = [d.read() for d in devices]
+
+    sampler = dev.startSampler( 1000.0 )
+
+    while ( not sampler.count ):
+        time.sleep( 0.001 )
+
+    sampled = [d.read() for d in devices]
+    dev.stopSampler()
+
+    assert direct == sampled == [dev.analogRead( port ) for port in dev.ANALOG_PORTS], (direct, sampled)
+
+    print( 'Grove_Analog_Device: bus and sampler reads match {0}'.format( sampled ) )
+
+    # one block read against a word read per port
+    count = 10000
+    ports = tuple( dev.ANALOG_PORTS )
+
+    for (name, read) in (('analogRead x{0}'.format( len( ports ) ), lambda: [dev.analogRead( p ) for p in ports]), ('analogReadAll', dev.analogReadAll)):
+        (transactions, wire_bytes, bus_time) = (sim.transactions, sim.wire_bytes, sim.busTime())
+        elapsed = timeit.timeit( read, number=count )
+
+        bus_time = sim.busTime() - bus_time
+
+        print( '{0}: {1} transactions, {2} bytes, {3:.0f} us bus time at 100 kHz, {4:.2f} us call time'.format(
+            name, (sim.transactions - transactions) // count, (sim.wire_bytes - wire_bytes) // count, bus_time * 1e6 / count, elapsed * 1e6 / count ) )
+
+    # baseline lookups, verbatim: enum keyed dictionaries resolved on every call
+    class Baseline( object ):
+        ANALOG_READ_BASE = Grove_Base_Hat_Device.ANALOG_READ_BASE
+        ANALOG_PORTS = dict( dev.ANALOG_PORTS )
+        DIGITAL_PORTS = dict( dev.DIGITAL_PORTS )
+        DIGITAL_DEVICES = {}
+
+        def __init__( self ):
+            self.__dev = I2C_Device( Grove_Base_Hat_Device.I2C_ADDRESS )
+
+        def __read_register( self, reg ):
+            return self.__dev.readWordData( reg )
+
+        def analogRead( self, port, rt=Grove_Base_Hat_Analog_Read_Type.VALUE ):
+            return self.__read_register( self.ANALOG_READ_BASE[rt] + self.ANALOG_PORTS[port] )
+
+        def __digital_device( self, port, direction ):
+            pin = self.DIGITAL_PORTS[port]
+
+            if ( pin not in self.DIGITAL_DEVICES.keys() ):
+                self.DIGITAL_DEVICES[pin] = ( port, GPIO_Device( pin, direction ) )
+
+            return self.DIGITAL_DEVICES[pin]
+
+        def gpio( self, port, direction ):
+            (pin, dev) = self.__digital_device( port, direction )
+            return dev
+
+        def digitalRead( self, port ):
+            dev = self.gpio( port, Grove_Digital_Port_Direction.INPUT )
+            return dev.read()
+
+        def digitalWrite( self, port, value ):
+            dev = self.gpio( port, Grove_Digital_Port_Direction.OUTPUT )
+            return dev.write( value )
+
+    baseline = Baseline()
+
+    count = 100000
+
+    port = Grove_Analog_Port.A0
+    channel = dev.analogChannel( port )
+
+    dport = Grove_Digital_Port.D5
+    dchannel = dev.digitalChannel( dport, Grove_Digital_Port_Direction.OUTPUT )
+
+    for (name, before, tables, after) in (
+            ('analog read', lambda: baseline.analogRead( port ), lambda: dev.analogRead( port ), channel.read),
+            ('digital read', lambda: baseline.digitalRead( dport ), lambda: dev.digitalRead( dport ), dchannel.read),
+            ('digital write', lambda: baseline.digitalWrite( dport, 1 ), lambda: dev.digitalWrite( dport, 1 ), lambda: dchannel.write( 1 ))):
+        times = [min( timeit.repeat( f, number=count, repeat=5 ) ) * 1e6 / count for f in (before, tables, after)]
+
+        print( '{0}: baseline {1:.3f} us, port tables {2:.3f} us, channel handle {3:.3f} us per call'.format( name, *times ) )
+
+# -------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()
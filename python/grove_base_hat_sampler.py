@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/rblankley/rpi-grove/blob/master/LICENSE
+#
+
+from array import array
+from threading import Event, Thread
+
+import time
+
+__all__ = ['Grove_Base_Hat_Sampler']
+
+# =================================================================================================
+class Grove_Base_Hat_Sampler( Thread ):
+    """! Thread object that samples Grove Base Hat analog ports into a ring buffer
+
+    Every sample holds all analog channels (one block read) and a monotonic timestamp. Samples are
+    stored in preallocated arrays; the sample count is published last so readers never take a lock.
+    """
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self, dev, ports, rt, rate, size=1024 ):
+        """! Initialize Class
+        @param dev  grove base hat device
+        @param ports  analog ports to sample
+        @param rt  read type to perform
+        @param rate  sample rate (in Hz)
+        @param size  ring buffer size (in samples)
+        """
+        super( Grove_Base_Hat_Sampler, self ).__init__()
+
+        # daemonize thread
+        self.daemon = True
+
+        if ( size < 2 ):
+            raise ValueError( 'ring buffer size must be at least 2 samples' )
+
+        self.__dev = dev
+        self.__ports = frozenset( ports )
+        self.__rt = rt
+        self.__period = 1.0 / rate
+        self.__size = size
+
+        self.__channels = dev.ANALOG_CHANNELS
+
+        # ring buffer
+        self.__timestamps = array( 'd', bytes( 8 * size ) )
+        self.__values = array( 'H', bytes( 2 * size * self.__channels ) )
+
+        self.__count = 0
+        self.__overruns = 0
+
+        self.__quit = Event()
+
+    # ---------------------------------------------------------------------------------------------
+    def stop( self ):
+        """! Stop thread and wait for completion """
+        self.__quit.set()
+        self.join()
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def readType( self ):
+        """! Retrieve read type
+        @return  read type
+        """
+        return self.__rt
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def rate( self ):
+        """! Retrieve sample rate
+        @return  sample rate (in Hz)
+        """
+        return 1.0 / self.__period
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def count( self ):
+        """! Retrieve number of samples taken
+        @return  sample count
+        """
+        return self.__count
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def capacity( self ):
+        """! Retrieve most samples held for window()
+        @return  number of samples (ring buffer size less one)
+        """
+        return self.__size - 1
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def overruns( self ):
+        """! Retrieve number of samples taken late
+        @return  overrun count
+        """
+        return self.__overruns
+
+    # ---------------------------------------------------------------------------------------------
+    def sampling( self, port ):
+        """! Check if port is sampled
+        @param port  analog port
+        @return  @c True if sampled, @c False otherwise
+        """
+        return ( port in self.__ports )
+
+    # ---------------------------------------------------------------------------------------------
+    def latest( self, port ):
+        """! Retrieve latest sample for port
+        @param port  analog port
+        @return  value, @c None if port not sampled or no samples yet
+        """
+        count = self.__count
+
+        if (( not count ) or ( port not in self.__ports )):
+            return None
+
+        return self.__values[((count - 1) % self.__size) * self.__channels + port.value]
+
+    # ---------------------------------------------------------------------------------------------
+    def window( self, n ):
+        """! Retrieve most recent samples
+        @param n  number of samples
+        @return  samples as (timestamps, values) where timestamps is an array of monotonic times
+                 (in s) and values an array of n rows by channel, oldest first
+        """
+        size = self.__size
+        channels = self.__channels
+
+        while ( True ):
+            count = self.__count
+            num = min( n, count, size - 1 )
+
+            end = count % size
+            start = (count - num) % size
+
+            if (( start < end ) or ( 0 == num )):
+                timestamps = self.__timestamps[start:end]
+                values = self.__values[start * channels:end * channels]
+            else:
+                timestamps = self.__timestamps[start:] + self.__timestamps[:end]
+                values = self.__values[start * channels:] + self.__values[:end * channels]
+
+            # retry when the sampler lapped the copied samples
+            if (( self.__count - count ) < ( size - num )):
+                return (timestamps, values)
+
+    # ---------------------------------------------------------------------------------------------
+    def run( self ):
+        """! Thread run method """
+        read = self.__dev.analogReadAll
+        rt = self.__rt
+
+        size = self.__size
+        channels = self.__channels
+
+        timestamps = self.__timestamps
+        values = self.__values
+
+        deadline = time.monotonic()
+
+        while ( not self.__quit.is_set() ):
+            sample = read( rt )
+            now = time.monotonic()
+
+            slot = self.__count % size
+            offset = slot * channels
+
+            values[offset:offset + channels] = array( 'H', sample )
+            timestamps[slot] = now
+
+            # publish sample
+            self.__count += 1
+
+            # sleep until next sample time
+            deadline += self.__period
+            delay = deadline - time.monotonic()
+
+            if ( 0.0 < delay ):
+                self.__quit.wait( delay )
+            else:
+                self.__overruns += 1
+                deadline = time.monotonic()
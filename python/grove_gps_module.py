@@ -5,13 +5,50 @@
 # For more information see https://github.com/rblankley/rpi-grove/blob/master/LICENSE
 #
 
-from serial_device import Serial_Device
+from gps_track import GPS_Track, gps_time
+from grove_ports import Grove_Digital_Port_Edge
+from nmea_parser import NMEA_GGA, NMEA_GSA, NMEA_GSV, NMEA_RMC, NMEA_VTG, NMEA_Parser
+from serial_async_device import Serial_Async_Device
+from serial_capture import Serial_Capture, Serial_Capture_Compression
+from serial_device import Serial_Device, Serial_Line_Framer
+from collections import namedtuple
 from threading import Lock
+from types import MappingProxyType
 
-import re
+import asyncio
+import gzip
+import io
+import mmap
+import os
 import time
 
-__all__ = ['Grove_GPS']
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+__all__ = ['Grove_GPS', 'Grove_GPS_Fix']
+
+# -------------------------------------------------------------------------------------------------
+# GPS fix snapshot, every field taken from the same GGA/RMC epoch
+#   utc         utc time (hhmmss.sss)
+#   date        date (ddmmyy)
+#   latitude    latitude (degrees)
+#   longitude   longitude (degrees)
+#   position    position fix indicator (0 = no fix)
+#   altitude    altitude (meters)
+#   geoids      geoid separation (meters)
+#   pdop        position dilution of precision
+#   hdop        horizontal dilution of precision
+#   vdop        vertical dilution of precision
+#   satellites  number of satellites in view
+#   used        tuple of satellites used as (talker, satellite id)
+#   info        read-only mapping of (elevation, azinmuth, snr) by (talker, satellite id)
+#   heading     true heading (degrees)
+#   velocity    velocity (km/hr)
+#   monotonic   local monotonic time of epoch (in ns)
+#   pps         @c True if monotonic time is from a PPS edge, @c False if from sentence reception
+Grove_GPS_Fix = namedtuple( 'Grove_GPS_Fix', 'utc date latitude longitude position altitude geoids pdop hdop vdop satellites used info heading velocity monotonic pps' )
 
 # =================================================================================================
 class Grove_GPS( object ):
@@ -19,115 +56,62 @@ class Grove_GPS( object ):
 
     DEBUG = False
 
-    GPGGA = ["$GPGGA",
-        "[0-9]{6}\.[0-9]{3}",                       # UTC Position (timestamp) hhmmss.sss
-        "[0-9]+\.[0-9]{2,}",                        # Latitude of position ddmm.mmmmm
-        "[NS]{1}",                                  # North or South Indicator
-        "[0-9]+\.[0-9]{2,}",                        # Longitude of position ddmm.mmmmm
-        "[EW]{1}",                                  # East or West Indicator
-        "[0123]",                                   # GPS Position Indicator; 0=Fix not available or invalid, 1=GPS SPS Mode, fix valid, 2=Differential GPS, SPS Mode, fix valid, 3=GPS PPS Mode, fix valid 
-        "[0-9]{1,2}",                               # Number of Satellites Used
-        "[0-9]+\.[0-9]*",                           # Horizontal Dilution of Precision x.x
-        "[0-9]+\.[0-9]*",                           # MSL Altitude x.x (meters)
-        "\w",                                       # MSL Altitude units
-        "-?[0-9]+\.[0-9]*",                         # Geoids Separation x.x (meters)
-        "\w",                                       # Geoids Separation units
-        ]
-
-    GPGSA = ["$GPGSA",
-        "[MA]{1}",                                  # Mode 1; M=Manual-forced to operate in 2D or 3D mode, A=Automatic-allowed to automatically switch 2D/3D
-        "[123]{1}",                                 # Mode 2; 1=Fix not available, 2=3D, 3=3D
-        "[0-9]*",                                   # Satellite Used on Channel 1
-        "[0-9]*",                                   # Satellite Used on Channel 2
-        "[0-9]*",                                   # Satellite Used on Channel 3
-        "[0-9]*",                                   # Satellite Used on Channel 4
-        "[0-9]*",                                   # Satellite Used on Channel 5
-        "[0-9]*",                                   # Satellite Used on Channel 6
-        "[0-9]*",                                   # Satellite Used on Channel 7
-        "[0-9]*",                                   # Satellite Used on Channel 8
-        "[0-9]*",                                   # Satellite Used on Channel 9
-        "[0-9]*",                                   # Satellite Used on Channel 10
-        "[0-9]*",                                   # Satellite Used on Channel 11
-        "[0-9]*",                                   # Satellite Used on Channel 12
-        "[0-9]+\.[0-9]*",                           # Position Dilution of Precision x.x
-        "[0-9]+\.[0-9]*",                           # Horizontal Dilution of Precision x.x
-        "[0-9]+\.[0-9]*",                           # Vertical Dilution of Precision x.x
-        ]
-
-    GPGSV = ["$GPGSV",
-        "[1-9]{1}",                                 # Number of Messages
-        "[1-9]{1}",                                 # Messages Number
-        "[0-9]{1,2}",                               # Number of Satellites Used
-        "[0-9]{1,2}",                               # Channel 1 Satellite ID (1-32)
-        "[0-9]{1,2}",                               # Channel 1 Satellite Elevation (degrees, max 90)
-        "[0-9]{1,3}",                               # Channel 1 Satellite Azinmuth (degrees true, 0-359)
-        "[0-9]*",                                   # Channel 1 SNR(C/NO) dBHz (0-99, null when not tracking)
-        ]
-
-    GPRMC = ["$GPRMC",
-        "[0-9]{6}\.[0-9]{3}",                       # UTS Position (timestamp) hhmmss.sss
-        "[AV]{1}",                                  # Status; A=data valid, V=data not valid
-        "[0-9]+\.[0-9]{2,}",                        # Latitude of position ddmm.mmmmm
-        "[NS]{1}",                                  # North or South Indicator
-        "[0-9]+\.[0-9]{2,}",                        # Longitude of position ddmm.mmmmm
-        "[EW]{1}",                                  # East or West Indicator
-        "[0-9]+\.[0-9]*",                           # Speed Over Ground (knots)
-        "[0-9]+\.[0-9]*",                           # Course Over Ground Heading (degrees true)
-        "[0-9]{6}",                                 # Date ddmmyy
-        ]
-
-    GPVTG = ["$GPVTG",
-        "[0-9]+\.[0-9]*",                           # Measured Heading (degrees true)
-        "[T]{1}",                                   # True
-        "[0-9]+\.[0-9]*",                           # Measured Heading magnetic (degrees magnetic)
-        "[M]{1}",                                   # Magnetic
-        "[0-9]+\.[0-9]*",                           # Measured Horizontal Speed (knots)
-        "[N]{1}",                                   # Knots
-        "[0-9]+\.[0-9]*",                           # Measured Horizontal Speed (kilometers)
-        "[K]{1}",                                   # Kilometers / hr
-        ]
-
     KNOTS_TO_KM_HR = 1.852
 
-    # ---------------------------------------------------------------------------------------------
-    def __init__( self, port = '/dev/ttyAMA0', baud = 9600, timeout = 0 ):
-        """! Initialize Class
-        @param port  serial device
-        @param baud  baud rate
-        @param timeout  timeout
-        """
+    NO_SATELLITES = MappingProxyType( {} )
 
-        # GGA Global positioning system fixed data
-        self.__gga = [] # contains compiled regex
+    # satellite ids overlap between constellations, so satellites are identified by talker too
+    TALKER_ALIASES = {'BD': 'GB', 'QZ': 'GQ'}
 
-        for p in self.GPGGA:
-            self.__gga.append( re.compile( p ) ) # compile regex once to use later
+    # talker by NMEA 4.10 GSA system id
+    SYSTEM_TALKERS = {1: 'GP', 2: 'GL', 3: 'GA', 4: 'GB', 5: 'GQ', 6: 'GI'}
 
-        # GSA GNSS DOP and Active Satellites
-        self.__gsa = [] # contains compiled regex
+    # epoch sentences
+    EPOCH_GGA = 0x01
+    EPOCH_RMC = 0x02
 
-        for p in self.GPGSA:
-            self.__gsa.append( re.compile( p ) ) # compile regex once to use later
+    EPOCH_COMPLETE = EPOCH_GGA | EPOCH_RMC
 
-        # GSV GNSS Satellites in View
-        self.__gsv = [] # contains compiled regex
+    # bytes read at a time by ingest()
+    INGEST_CHUNK_SIZE = 1 << 16
 
-        for p in self.GPGSV:
-            self.__gsv.append( re.compile( p ) ) # compile regex once to use later
+    # pps edges held between epochs, and longest time from an epoch's utc time to its first
+    # sentence being processed
+    PPS_QUEUE_SIZE = 8
+    PPS_WINDOW_NS = 1000000000
 
-        self.__gsv_lines = []
+    # fixes held for each slow fixes() consumer
+    FIX_QUEUE_SIZE = 16
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self, port = '/dev/ttyAMA0', baud = 9600, timeout = 0, loop = None, track_size = 0, pps = None ):
+        """! Initialize Class
+        @param port  serial device, @c None to only process sentences given to ingest()
+        @param baud  baud rate
+        @param timeout  timeout
+        @param loop  asyncio event loop to read the serial port from, @c None for a reader thread
+        @param track_size  number of fixes kept in track history, 0 for none
+        @param pps  gpio device of PPS input (e.g. Grove_Base_Hat_Device.gpio()), @c None for none
+        """
 
-        # RMC Recommended Minimum Specific GNSS Data
-        self.__rmc = [] # contains compiled regex
+        self.__parser = NMEA_Parser()
+        self.__parse = self.__parser.parse
 
-        for p in self.GPRMC:
-            self.__rmc.append( re.compile( p ) ) # compile regex once to use later
+        # record processing by record type; looked up once per sentence
+        self.__handlers = {
+            NMEA_GGA: self.__process_gga,
+            NMEA_GSA: self.__process_gsa,
+            NMEA_GSV: self.__process_gsv_record,
+            NMEA_RMC: self.__process_rmc,
+            NMEA_VTG: self.__process_vtg,
+        }
 
-        # VTG Course Over Ground and Ground Speed
-        self.__vtg = [] # contains compiled regex
+        # GSV records by talker (constellation); satellite tables by (talker, satellite id), by talker
+        self.__gsv_records = {}
+        self.__gsv_tables = {}
 
-        for p in self.GPVTG:
-            self.__vtg.append( re.compile( p ) ) # compile regex once to use later
+        # satellites used by constellation in the epoch being assembled
+        self.__gsa_used = {}
 
         # default values
         self.__timestamp = 0.0
@@ -138,29 +122,83 @@ class Grove_GPS( object ):
         self.__altitude = 0.0
         self.__geoids = 0.0
 
-        self.__satellitesUsed = []
+        self.__satellitesUsed = ()
         self.__pdop = 0.0
         self.__hdop = 0.0
         self.__vdop = 0.0
 
-        self.__satellitesUsedInfo = {}              # tuple of (elevation, azinmuth, SNR(C/NO)) by satellite id
+        self.__satellitesUsedInfo = self.NO_SATELLITES  # tuple of (elevation, azinmuth, SNR(C/NO)) by (talker, satellite id)
+
+        # satellites used information by talker, built on request as (satellites used information, view)
+        self.__constellations = (self.NO_SATELLITES, self.NO_SATELLITES)
+
+        # satellite id views of the last fix tables, as (fix table, view)
+        self.__ids_used = ((), ())
+        self.__ids_info = (self.NO_SATELLITES, self.NO_SATELLITES)
 
         self.__heading = 0.0
         self.__velocity = 0.0
 
         self.__date = 0
 
+        # epoch being assembled
+        self.__epoch = None
+        self.__epoch_seen = 0
+        self.__epoch_time = 0
+        self.__epoch_pps = False
+
+        self.__fix = Grove_GPS_Fix(
+            0.0, 0, 0.0, 0.0, 0, 0.0, 0.0, 0.0, 0.0, 0.0, 0, self.__satellitesUsed, self.__satellitesUsedInfo, 0.0, 0.0, 0, False )
+
+        # pps edges (monotonic ns) recent enough to start the second of a later epoch
+        self.__pps = pps
+        self.__pps_edges = []
+
+        if ( pps is not None ):
+            pps.enableEventQueue( self.PPS_QUEUE_SIZE, Grove_Digital_Port_Edge.RISING )
+
+        # track history
+        self.__track = GPS_Track( track_size + 1 ) if ( 0 < track_size ) else None
+
+        # fixes() consumers as (loop, queue)
+        self.__listeners = ()
+
+        self.__on_fix_handle = None
+
         # start serial device
         self.__lock = Lock()
+        self.__loop = loop
 
-        self.__ser = Serial_Device( port, baud, timeout )
-        self.__ser.on_process_command = self.__process_command
-        self.__ser.start()
+        if ( port is None ):
+            self.__ser = None
+        elif ( loop is not None ):
+            self.__ser = Serial_Async_Device( port, baud, loop )
+        else:
+            self.__ser = Serial_Device( port, baud, timeout )
+
+        if ( self.__ser is not None ):
+            self.__ser.on_process_command = self.__process_command
+            self.__ser.start()
 
     # ---------------------------------------------------------------------------------------------
     def __del__( self ):
         """! Finalize Class """
-        self.__ser.stop()
+        if ( self.__ser is not None ):
+            self.__ser.stop()
+
+        self.stopCapture()
+
+        if ( self.__pps is not None ):
+            self.__pps.disableEventQueue()
+
+    # ---------------------------------------------------------------------------------------------
+    @classmethod
+    def replay( cls, source ):
+        """! Replay logged sentences without a serial device
+        @param source  log path, file object, memory map, bytes or iterable of lines; see ingest()
+        @return  iterator of fixes
+        """
+        return cls( port=None ).ingest( source )
 
     # ---------------------------------------------------------------------------------------------
     def __debug( self, s ):
@@ -171,327 +209,597 @@ class Grove_GPS( object ):
             print( s )
 
     # ---------------------------------------------------------------------------------------------
-    def __split( self, ident, line ):
-        """! Split lines on separator
-        @param ident  identifier
-        @param line  line to split
-        @return  array of lines
+    @staticmethod
+    def __put_fix( queue, fix ):
+        """! Queue fix for consumer, dropping the oldest fix when full
+        @param queue  consumer queue
+        @param fix  fix
+        """
+        if ( queue.full() ):
+            queue.get_nowait()
+
+        queue.put_nowait( fix )
+
+    # ---------------------------------------------------------------------------------------------
+    def __publish( self, fix ):
+        """! Publish fix to fixes() consumers
+        @param fix  fix
         """
+        for (loop, queue) in self.__listeners:
+            if ( loop is self.__loop ):
+                self.__put_fix( queue, fix )
+            else:
+                loop.call_soon_threadsafe( self.__put_fix, queue, fix )
 
-        # sometimes multiple GPS data packets come into the stream... take the data only after the last ident is seen
-        i = line.rindex( ident )
-        line = line[i:]
+    # ---------------------------------------------------------------------------------------------
+    def __publish_fix( self ):
+        """! Publish fix snapshot of current values """
+        fix = Grove_GPS_Fix(
+            self.__timestamp, self.__date, self.__latitude, self.__longitude, self.__pos, self.__altitude, self.__geoids,
+            self.__pdop, self.__hdop, self.__vdop, self.__satellites, self.__satellitesUsed, self.__satellitesUsedInfo,
+            self.__heading, self.__velocity, self.__epoch_time, self.__epoch_pps )
+
+        # readers pick up the new snapshot with a single reference swap
+        self.__fix = fix
+        self.__epoch_seen = 0
 
-        lines = line.split( "," )
+        # track positions once both time and date are known
+        if (( self.__track is not None ) and ( self.__pos ) and ( self.__date )):
+            self.__track.append( gps_time( self.__date, self.__timestamp ), self.__latitude, self.__longitude, self.__altitude, self.__velocity )
 
-        # look for checksum and strip
-        checksum = lines[-1]
+        if ( self.__listeners ):
+            self.__publish( fix )
 
-        if ( "*" in checksum ):
-            i = checksum.index( "*" )
-            lines[-1] = checksum[:i]
+        handle = self.__on_fix_handle
 
-        return lines
+        if ( handle is not None ):
+            handle( fix )
 
     # ---------------------------------------------------------------------------------------------
-    def __validate_expression( self, ident, line, exp ):
-        """! Runs regex validation on a line
-        @param ident  identifier
-        @param line  line to parse
-        @param exp  regex
-        @return  @c True if everything is all right, @c False if the sentence is mangled
+    def __begin_epoch( self, utc ):
+        """! Begin epoch sentence, publishing previous epoch if it never completed
+        @param utc  utc time of sentence
         """
-        if ( not line.startswith( ident ) ):
-            return False
+        if ( utc != self.__epoch ):
+            received = time.monotonic_ns()
 
-        lines = self.__split( ident, line )
-        self.__debug( lines )
+            if ( self.__epoch_seen ):
+                self.__publish_fix()
 
-        if ( len(lines) < len(exp) ):
-            self.__debug( "Failed: wrong number of parameters " )
-            self.__debug( exp )
-            return False
+            self.__epoch = utc
+            self.__epoch_seen = 0
 
-        for i in range( 1, len(exp) ):
-            if ( not exp[i].match( lines[i] ) ):
-                self.__debug( "Failed: wrong format on parameter %d" % i )
-                return False
-            else:
-                self.__debug( "Passed %d" % i )
+            self.__gsa_used = {}
 
-        return True
+            self.__epoch_time = received
+            self.__epoch_pps = False
+
+            if ( self.__pps is not None ):
+                self.__pps_epoch( utc, received )
 
     # ---------------------------------------------------------------------------------------------
-    def __process_gsv( self ):
-        """! Process GSV line data """
-        self.__satellitesUsedInfo = {}
+    def __pps_epoch( self, utc, received ):
+        """! Time epoch from the PPS edge that started its second
+        The receiver pulses at the start of each UTC second and sends the sentences of an epoch
+        after its utc time, so the second started with an edge at most @c PPS_WINDOW_NS before
+        the epoch was received less its fraction of a second. An epoch late in the second (e.g.
+        .900 at 10 Hz) may be processed after the next edge, which must not be matched. When more
+        than one edge fits the epoch is ambiguous and keeps its reception time.
+        @param utc  utc time of epoch
+        @param received  monotonic time first sentence of epoch was processed (in ns)
+        """
+        edges = self.__pps_edges
+        edges.extend( timestamp for (timestamp, level) in self.__pps.drainEvents() )
 
-        # process each line
-        for line in self.__gsv_lines:
-            lines = self.__split( self.GPGSV[0], line )
+        # utc has millisecond resolution
+        offset = round( (utc % 1.0) * 1000.0 ) * 1000000
 
-            # retrieve satellite info
-            # message may contain up to 4 satellites
-            for i in (4, 8, 12, 16):
-                if ( i < len(lines) ):
-                    sat_id = int( lines[i] )
+        start = received - offset
+        oldest = start - self.PPS_WINDOW_NS
 
-                    if ( 0 < sat_id ):
-                        values = []
+        matches = [timestamp for timestamp in edges if oldest < timestamp <= start]
 
-                        # unused satellites may not contain elevation, azinmuth, snr
-                        for j in range( 1, 4 ):
-                            if ( len( lines[i+j] ) ):
-                                values.append( int( lines[i+j] ) )
-                            else:
-                                values.append( None )
+        # keep edges that may start the second of later epochs, including the matched edge
+        self.__pps_edges = [timestamp for timestamp in edges if oldest < timestamp]
 
-                        # (elevation, azinmuth, snr)
-                        self.__satellitesUsedInfo[sat_id] = (values[0], values[1], values[2])
+        if ( 1 == len( matches ) ):
+            self.__epoch_time = matches[0] + offset
+            self.__epoch_pps = True
 
-        self.__satellites = len( self.__satellitesUsedInfo )
+        elif ( matches ):
+            self.__debug( "PPS edge ambiguous" )
 
     # ---------------------------------------------------------------------------------------------
-    def __process_command( self, line ):
-        """! Process command
-        @param line  command to process
+    def __end_epoch( self, sentence ):
+        """! End epoch sentence, publishing fix once epoch is complete
+        @param sentence  epoch sentence seen
+        """
+        self.__epoch_seen |= sentence
+
+        if ( self.EPOCH_COMPLETE == self.__epoch_seen ):
+            self.__publish_fix()
+
+    # ---------------------------------------------------------------------------------------------
+    def __process_gsv( self, talker ):
+        """! Process GSV records
+        @param talker  constellation talker of records
         """
-        if ( not len( line ) ):
+        # message may contain up to 4 satellites as (id, elevation, azinmuth, snr)
+        info = {(talker, s[0]): s[1:] for record in self.__gsv_records[talker] for s in record.satellites if ( 0 < s[0] )}
+
+        # tables are replaced, never changed, once published
+        tables = self.__gsv_tables
+        tables[talker] = info
+
+        # merge constellations
+        if ( 1 < len( tables ) ):
+            info = {}
+
+            for table in tables.values():
+                info.update( table )
+
+        # read-only view, shared by every fix until the next cycle
+        self.__satellitesUsedInfo = MappingProxyType( info )
+        self.__satellites = len( info )
+
+    # ---------------------------------------------------------------------------------------------
+    @staticmethod
+    def __combined_talker( sat_id ):
+        """! Find constellation of satellite from a combined (GN) GSA without system id
+        @param sat_id  satellite id
+        @return  talker by NMEA 4.0 satellite id range (GPS and SBAS 1-64, GLONASS 65-96), GN if
+                 unknown
+        """
+        if ( sat_id <= 64 ):
+            return 'GP'
+        elif ( sat_id <= 96 ):
+            return 'GL'
+
+        return 'GN'
+
+    # ---------------------------------------------------------------------------------------------
+    def __process_gga( self, record ):
+        """! Process GGA record
+        @param record  record
+        """
+        if ( record.utc is None ):
+            self.__debug( "GGA time not available" )
             return
 
-        self.__lock.acquire()
-        self.__debug( line )
+        self.__begin_epoch( record.utc )
 
-        # gga
-        if ( self.__validate_expression( self.GPGGA[0], line, self.__gga ) ):
-            lines = self.__split( self.GPGGA[0], line )
+        # no fix epochs are published too; position fields keep their last known values
+        self.__timestamp = record.utc
+        self.__pos = record.position
+        self.__satellites = record.satellites or 0
 
-            self.__timestamp = float( lines[1] )
+        if ( record.latitude is not None ):
+            self.__latitude = record.latitude
+        if ( record.longitude is not None ):
+            self.__longitude = record.longitude
+        if ( record.hdop is not None ):
+            self.__hdop = record.hdop
+        if ( record.altitude is not None ):
+            self.__altitude = record.altitude
+        if ( record.geoids is not None ):
+            self.__geoids = record.geoids
 
-            lat = float( lines[2] )
-            NS = lines[3]
+        self.__end_epoch( self.EPOCH_GGA )
 
-            self.__latitude = lat // 100 + lat % 100 / 60
-            if ( NS == "S" ):
-                self.__latitude *= -1.0
+    # ---------------------------------------------------------------------------------------------
+    def __process_gsa( self, record ):
+        """! Process GSA record
+        @param record  record
+        """
+        talker = self.SYSTEM_TALKERS.get( record.system, self.TALKER_ALIASES.get( record.talker, record.talker ) )
+        satellites = ()
 
-            lon = float( lines[4] )
-            EW = lines[5]
+        if ( 1 == record.fix ):
+            self.__debug( "Fix not available" )
+        elif ( 'GN' == talker ):
+            satellites = tuple( [(self.__combined_talker( sat_id ), sat_id) for sat_id in record.satellites] )
 
-            self.__longitude = lon // 100 + lon % 100 / 60
-            if ( EW == "W" ):
-                self.__longitude = -self.__longitude
+            # NMEA 4.0 receivers send one GN GSA per constellation
+            if ( satellites ):
+                talker = satellites[0][0]
+        else:
+            satellites = tuple( [(talker, sat_id) for sat_id in record.satellites] )
 
-            self.__pos = int( lines[6] )
-            self.__satellites = int( lines[7] )
-            self.__hdop = float( lines[8] )
-            self.__altitude = float( lines[9] )
-            self.__geoids = float( lines[11] )
+        # multi-constellation receivers send one GSA per constellation each epoch; a repeated
+        # GSA replaces its constellation
+        used = self.__gsa_used
+        used[talker] = satellites
 
-        # gsa
-        elif ( self.__validate_expression( self.GPGSA[0], line, self.__gsa ) ):
-            lines = self.__split( self.GPGSA[0], line )
+        self.__satellitesUsed = satellites if ( 1 == len( used ) ) else tuple( [s for v in used.values() for s in v] )
 
-            if ( '1' == lines[2] ):
-                self.__debug( "Fix not available" )
+        if ( record.pdop is not None ):
+            self.__pdop = record.pdop
+        if ( record.hdop is not None ):
+            self.__hdop = record.hdop
+        if ( record.vdop is not None ):
+            self.__vdop = record.vdop
 
-            else:
-                self.__satellitesUsed = []
+    # ---------------------------------------------------------------------------------------------
+    def __process_gsv_record( self, record ):
+        """! Process GSV record
+        @param record  record
+        """
+        talker = self.TALKER_ALIASES.get( record.talker, record.talker )
 
-                for s in lines[3:15]:
-                    if ( len(s ) ):
-                        self.__satellitesUsed.append( int( s ) )
+        # save off all records of constellation
+        # process them all once we have all of them
+        if ( 1 == record.message ):
+            self.__gsv_records[talker] = []
 
-                self.__pdop = float( lines[15] )
-                self.__hdop = float( lines[16] )
-                self.__vdop = float( lines[17] )
+        records = self.__gsv_records.get( talker )
 
-        # gsv
-        elif ( self.__validate_expression( self.GPGSV[0], line, self.__gsv ) ):
-            lines = self.__split( self.GPGSV[0], line )
+        if ( records is not None ):
+            records.append( record )
 
-            num_gsv = int( lines[1] )
-            gsv_index = int( lines[2] ) - 1
+            # we have all records
+            if ( record.messages == len( records ) ):
+                self.__process_gsv( talker )
 
-            # save off all lines
-            # process them all once we have all of them
-            if ( 0 == gsv_index ):
-                self.__gsv_lines = []
+    # ---------------------------------------------------------------------------------------------
+    def __process_rmc( self, record ):
+        """! Process RMC record
+        @param record  record
+        """
+        if ( record.utc is None ):
+            self.__debug( "RMC time not available" )
+            return
 
-            self.__gsv_lines.append( line )
+        self.__begin_epoch( record.utc )
 
-            # we have all lines
-            if ( num_gsv == len( self.__gsv_lines ) ):
-                self.__process_gsv()
+        if ( not record.valid ):
+            self.__debug( "RMC data not valid" )
 
-        # rmc
-        elif ( self.__validate_expression( self.GPRMC[0], line, self.__rmc ) ):
-            lines = self.__split( self.GPRMC[0], line )
+        else:
+            if ( record.speed is not None ):
+                self.__velocity = record.speed * self.KNOTS_TO_KM_HR
+            if ( record.course is not None ):
+                self.__heading = record.course
+            if ( record.date is not None ):
+                self.__date = record.date
 
-            if ( 'A' != lines[2] ):
-                self.__debug( "RMC data not valid" )
+        self.__end_epoch( self.EPOCH_RMC )
 
-            else:
-                self.__velocity = float( lines[7] ) * self.KNOTS_TO_KM_HR
-                self.__heading = float( lines[8] )
-                self.__date = float( lines[9] )
+    # ---------------------------------------------------------------------------------------------
+    def __process_vtg( self, record ):
+        """! Process VTG record
+        @param record  record
+        """
+        if ( record.heading is not None ):
+            self.__heading = record.heading
+        if ( record.speed is not None ):
+            self.__velocity = record.speed * self.KNOTS_TO_KM_HR
+
+    # ---------------------------------------------------------------------------------------------
+    def __process_command( self, line ):
+        """! Process command
+        @param line  command to process
+        """
+        record = self.__parse( line )
 
-        # vtg
-        elif ( self.__validate_expression( self.GPVTG[0], line, self.__vtg ) ):
-            lines = self.__split( self.GPVTG[0], line )
+        if ( record is not None ):
+            self.__handlers[type( record )]( record )
 
-            self.__heading = float( lines[1] )
-            self.__velocity = float( lines[5] ) * self.KNOTS_TO_KM_HR
+    # ---------------------------------------------------------------------------------------------
+    def fix( self ):
+        """! Retrieve most recent fix
+        @return  fix, fields all from the same GGA/RMC epoch
+        """
+        return self.__fix
 
-        self.__lock.release()
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def on_fix( self ):
+        """! Retrieve callback handle for published fixes
+        @return  handle
+        """
+        return self.__on_fix_handle
+
+    # ---------------------------------------------------------------------------------------------
+    @on_fix.setter
+    def on_fix( self, handle ):
+        """! Set callback handle for published fixes; called with each fix on the thread that
+        processes sentences, so it must not block
+        @param handle  callback handle, @c None to remove
+        """
+        if (( handle is not None ) and ( not callable( handle ) )):
+            return
+
+        self.__on_fix_handle = handle
+
+    # ---------------------------------------------------------------------------------------------
+    def track( self ):
+        """! Retrieve track history
+        @return  track, @c None if not enabled
+        """
+        return self.__track
 
     # ---------------------------------------------------------------------------------------------
     def utc( self ):
         """! Retrieve UTC Time
         @return  utc time (hhmmss)
         """
-        self.__lock.acquire()
-        result = int( self.__timestamp )
-        self.__lock.release()
-
-        return result
+        return int( self.__fix.utc )
 
     # ---------------------------------------------------------------------------------------------
     def date( self ):
         """! Retrieve UTC Date
         @return  date (ddmmyy)
         """
-        self.__lock.acquire()
-        result = int( self.__date )
-        self.__lock.release()
-
-        return result
+        return int( self.__fix.date )
 
     # ---------------------------------------------------------------------------------------------
     def location( self ):
         """! Retrieve current location
         @return  location as (latitude, longitude)
         """
-        self.__lock.acquire()
-        result = (self.__latitude, self.__longitude)
-        self.__lock.release()
-
-        return result
+        fix = self.__fix
+        return (fix.latitude, fix.longitude)
 
     # ---------------------------------------------------------------------------------------------
     def link( self ):
         """! Check for satellite link
         @return  @c True if link exists, @c False otherwise
         """
-        self.__lock.acquire()
-
-        if ( 0 == self.__pos ):
-            result = False
-        else:
-            result = True
-
-        self.__lock.release()
-
-        return result
+        return ( 0 != self.__fix.position )
 
     # ---------------------------------------------------------------------------------------------
     def altitude( self ):
         """! Retrieve current altitude
         @return  altitude (meters)
         """
-        self.__lock.acquire()
-        result = self.__altitude
-        self.__lock.release()
-
-        return result
+        return self.__fix.altitude
 
     # ---------------------------------------------------------------------------------------------
     def pdop( self ):
         """! Retrieve position dilution of precision
         @return  pdop
         """
-        self.__lock.acquire()
-        result = self.__pdop
-        self.__lock.release()
-
-        return result
+        return self.__fix.pdop
 
     # ---------------------------------------------------------------------------------------------
     def hdop( self ):
         """! Retrieve horizontal dilution of precision
         @return  hdop
         """
-        self.__lock.acquire()
-        result = self.__hdop
-        self.__lock.release()
-
-        return result
+        return self.__fix.hdop
 
     # ---------------------------------------------------------------------------------------------
     def vdop( self ):
         """! Retrieve vertical dilution of precision
         @return  hdop
         """
-        self.__lock.acquire()
-        result = self.__vdop
-        self.__lock.release()
-
-        return result
+        return self.__fix.vdop
 
     # ---------------------------------------------------------------------------------------------
     def satellitesInView( self ):
         """! Retrieve number of satellites in view
         @return  number of satellites in view
         """
-        self.__lock.acquire()
-        result = self.__satellites
-        self.__lock.release()
-
-        return result
+        return self.__fix.satellites
 
     # ---------------------------------------------------------------------------------------------
     def satellitesUsed( self ):
         """! Retrieve satellites used
-        @return  satellites used
+        Satellite ids of different constellations may be equal; fix().used holds them as
+        (talker, satellite id).
+        @return  tuple of satellites used id
         """
-        self.__lock.acquire()
-        result = self.__satellitesUsed
-        self.__lock.release()
+        used = self.__fix.used
+        (table, ids) = self.__ids_used
+
+        if ( table is not used ):
+            ids = tuple( [sat_id for (talker, sat_id) in used] )
+            self.__ids_used = (used, ids)
 
-        return result
+        return ids
 
     # ---------------------------------------------------------------------------------------------
     def satellitesUsedInfo( self ):
         """! Retrieve satellites used information
-        @return  dictionary of (elevation, azinmuth, snr) by satellites used id
+        Satellite ids of different constellations may be equal, the last constellation wins;
+        fix().info and constellations() keep them apart.
+        @return  read-only mapping of (elevation, azinmuth, snr) by satellites used id, across all
+                 constellations
         """
-        self.__lock.acquire()
-        result = self.__satellitesUsedInfo
-        self.__lock.release()
+        info = self.__fix.info
+        (table, ids) = self.__ids_info
+
+        if ( table is not info ):
+            ids = MappingProxyType( dict( [(sat_id, value) for ((talker, sat_id), value) in info.items()] ) )
+            self.__ids_info = (info, ids)
+
+        return ids
+
+    # ---------------------------------------------------------------------------------------------
+    def constellations( self ):
+        """! Retrieve satellites used information per constellation
+        @return  read-only mapping of satellites used information by talker (GP, GL, GA, GB, ...)
+        """
+        info = self.__satellitesUsedInfo
+        (table, constellations) = self.__constellations
+
+        if ( table is not info ):
+            tables = {}
+
+            for ((talker, sat_id), value) in info.items():
+                tables.setdefault( talker, {} )[sat_id] = value
 
-        return result
+            constellations = MappingProxyType( dict( [(talker, MappingProxyType( v )) for (talker, v) in tables.items()] ) )
+            self.__constellations = (info, constellations)
+
+        return constellations
 
     # ---------------------------------------------------------------------------------------------
     def heading( self ):
         """! Retrieve true heading
         @return  heading (degrees)
         """
-        self.__lock.acquire()
-        result = self.__heading
-        self.__lock.release()
-
-        return result
+        return self.__fix.heading
 
     # ---------------------------------------------------------------------------------------------
     def velocity( self ):
         """! Retrieve current velocity
         @return  velocity (km/hr)
         """
+        return self.__fix.velocity
+
+    # ---------------------------------------------------------------------------------------------
+    def __frame( self, f ):
+        """! Split binary file into lines
+        @param f  binary file object
+        @return  iterator of lines
+        """
+        size = self.INGEST_CHUNK_SIZE
+        framer = Serial_Line_Framer()
+
+        for data in iter( lambda: f.read( size ), b'' ):
+            yield from framer.feed( data )
+
+        yield from framer.feed( b'\n' )
+
+    # ---------------------------------------------------------------------------------------------
+    def __chunks( self, source ):
+        """! Split source into lines
+        @param source  log path (.gz and .zst captures are decompressed), binary or text file object,
+                       memory map, bytes or iterable of lines
+        @return  iterator of lines
+        """
+        size = self.INGEST_CHUNK_SIZE
+
+        # path; compressed by Serial_Capture extension
+        if ( isinstance( source, (str, os.PathLike) ) ):
+            path = os.fspath( source )
+
+            if ( path.endswith( Serial_Capture.EXTENSIONS[Serial_Capture_Compression.GZIP] ) ):
+                f = gzip.open( path, 'rb' )
+            elif ( path.endswith( Serial_Capture.EXTENSIONS[Serial_Capture_Compression.ZSTD] ) ):
+                if ( zstandard is None ):
+                    raise ValueError( 'zstd captures require the zstandard module' )
+
+                f = zstandard.ZstdDecompressor().stream_reader( open( path, 'rb' ) )
+            else:
+                f = open( path, 'rb' )
+
+            with f:
+                yield from self.__frame( f )
+
+        # memory map or buffer; framed in chunks without copying the whole log
+        elif ( isinstance( source, (mmap.mmap, bytes, bytearray, memoryview) ) ):
+            framer = Serial_Line_Framer()
+
+            with memoryview( source ) as view:
+                for i in range( 0, len( view ), size ):
+                    yield from framer.feed( view[i:i + size] )
+
+            yield from framer.feed( b'\n' )
+
+        # binary file, including gzip and zstd readers
+        elif ( isinstance( source, (io.RawIOBase, io.BufferedIOBase) ) ):
+            yield from self.__frame( source )
+
+        # text file or iterable of lines
+        else:
+            for line in source:
+                yield line if ( isinstance( line, str ) ) else str( line, 'utf-8', 'replace' )
+
+    # ---------------------------------------------------------------------------------------------
+    def ingest( self, source ):
+        """! Process logged sentences as fast as they can be read
+        Runs the same parser as the serial device; an epoch left incomplete at the end of the
+        source is published last.
+        @param source  log path (.gz and .zst captures are decompressed), binary or text file object,
+                       memory map, bytes or iterable of lines
+        @return  iterator of fixes, in order published
+        """
+        parse = self.__parse
+        handlers = self.__handlers
+        fix = self.__fix
+
+        # same as __process_command without a call per line; line endings are left to the parser,
+        # as for lines from the serial device
+        for line in self.__chunks( source ):
+            record = parse( line )
+
+            if ( record is None ):
+                continue
+
+            handlers[type( record )]( record )
+
+            # a record completes at most one epoch
+            if ( fix is not self.__fix ):
+                fix = self.__fix
+                yield fix
+
+        if ( self.__epoch_seen ):
+            self.__publish_fix()
+            yield self.__fix
+
+    # ---------------------------------------------------------------------------------------------
+    def startCapture( self, path, compression=Serial_Capture_Compression.GZIP, max_bytes=16 << 20, max_age=3600.0 ):
+        """! Start capturing raw receiver data to disk
+        @param path  capture file path prefix
+        @param compression  file compression
+        @param max_bytes  rotate after this many bytes, 0 for no limit
+        @param max_age  rotate after this many seconds, 0 for no limit
+        @return  capture
+        """
+        if ( self.__ser is None ):
+            raise ValueError( 'no serial device to capture' )
+
+        self.stopCapture()
+
+        capture = Serial_Capture( path, compression, max_bytes, max_age )
+        capture.start()
+
+        self.__ser.capture = capture
+
+        return capture
+
+    # ---------------------------------------------------------------------------------------------
+    def stopCapture( self ):
+        """! Stop capturing raw receiver data; data already received is written first """
+        if ( self.__ser is None ):
+            return
+
+        capture = self.__ser.capture
+
+        if ( capture is not None ):
+            self.__ser.capture = None
+            capture.stop()
+
+    # ---------------------------------------------------------------------------------------------
+    def sentenceStatistics( self ):
+        """! Retrieve received sentence statistics, for monitoring link quality
+        @return  dictionary of (accepted, checksum errors, format errors) by sentence type; errors
+                 count only corrupted or malformed sentences, not sentences sent without a fix
+        """
+        return self.__parser.statistics()
+
+    # ---------------------------------------------------------------------------------------------
+    async def fixes( self ):
+        """! Stream of fixes
+        Yields each fix as its epoch completes; use as @c async @c for @c fix @c in @c gps.fixes().
+        @return  async iterator of fixes
+        """
+        listener = (asyncio.get_running_loop(), asyncio.Queue( self.FIX_QUEUE_SIZE ))
+
         self.__lock.acquire()
-        result = self.__velocity
+        self.__listeners += (listener,)
         self.__lock.release()
 
-        return result
+        try:
+            while ( True ):
+                yield await listener[1].get()
+
+        finally:
+            self.__lock.acquire()
+            self.__listeners = tuple( l for l in self.__listeners if l is not listener )
+            self.__lock.release()
 
 
 # =================================================================================================
@@ -502,6 +810,17 @@ class Grove_GPS( object ):
 
 # -------------------------------------------------------------------------------------------------
 def main():
+    import sys
+
+    # replay recorded log
+    if ( 1 < len( sys.argv ) ):
+        start = time.perf_counter()
+        count = sum( 1 for fix in Grove_GPS.replay( sys.argv[1] ) )
+        elapsed = time.perf_counter() - start
+
+        print( '{0} fixes in {1:.3f} s, {2:.0f} fixes/s'.format( count, elapsed, count / elapsed ) )
+        return
+
     gps = Grove_GPS()
 
     try:
@@ -533,6 +852,11 @@ def main():
                 print( 'Velocity', gps.velocity() )
                 print( 'True Heading', gps.heading() )
 
+                fix = gps.fix()
+                print( 'Epoch time', fix.monotonic, 'PPS' if fix.pps else 'received' )
+
+            print( 'Sentences', gps.sentenceStatistics() )
+
             time.sleep( 1.0 )
 
     finally:
@@ -7,7 +7,7 @@
 
 from enum import Enum
 
-__all__ = ['Grove_Analog_Port', 'Grove_Digital_Port', 'Grove_Digital_Port_Direction']
+__all__ = ['Grove_Analog_Port', 'Grove_Digital_Port', 'Grove_Digital_Port_Direction', 'Grove_Digital_Port_Edge']
 
 # =================================================================================================
 class Grove_Analog_Port( Enum ):
@@ -23,3 +23,8 @@ class Grove_Digital_Port( Enum ):
 class Grove_Digital_Port_Direction( Enum ):
     """! Grove Digital Port Direction """
     INPUT, OUTPUT = range( 0, 2 )
+
+# =================================================================================================
+class Grove_Digital_Port_Edge( Enum ):
+    """! Grove Digital Port Edge """
+    RISING, FALLING, BOTH = range( 0, 3 )
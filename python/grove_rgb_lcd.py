@@ -6,7 +6,7 @@
 #
 
 from enum import Enum
-from i2c_device import I2C_Device
+from i2c_device import I2C_Device, I2C_Transaction_Priority
 
 import time
 
@@ -83,9 +83,9 @@ class Grove_RGB_LCD( object ):
         @param dotsize  lcd dot size
         """
 
-        # setup devices
-        self.__lcd_dev = I2C_Device( self.LCD_I2C_ADDRESS )
-        self.__rgb_dev = I2C_Device( self.RGB_I2C_ADDRESS )
+        # setup devices; display refresh yields the bus to other users
+        self.__lcd_dev = I2C_Device( self.LCD_I2C_ADDRESS, priority=I2C_Transaction_Priority.LOW )
+        self.__rgb_dev = I2C_Device( self.RGB_I2C_ADDRESS, priority=I2C_Transaction_Priority.LOW )
 
         # setup
         self.numcols = cols
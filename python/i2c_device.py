@@ -5,43 +5,298 @@
 # For more information see https://github.com/rblankley/rpi-grove/blob/master/LICENSE
 #
 
+from contextlib import contextmanager
+from enum import Enum
+from threading import Condition, get_ident, Lock
+
+import heapq
+import itertools
 import sys
+import time
+
+__all__ = ['I2C_Transaction_Priority', 'I2C_Bus_Arbiter', 'I2C_Bus_Pool', 'I2C_Device']
+
+# =================================================================================================
+class I2C_Transaction_Priority( Enum ):
+    """! I2C Transaction Priorities (lower value is served first) """
+    HIGH, NORMAL, LOW = range( 0, 3 )
+
+# =================================================================================================
+class I2C_Bus_Arbiter( object ):
+    """! Per-bus transaction arbiter
+
+    Serializes transactions on a bus. Waiting threads are served by priority, then in arrival
+    order. The owning thread may nest transactions.
+    """
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self ):
+        """! Initialize Class """
+        self.__cond = Condition( Lock() )
+        self.__waiting = []                         # heap of (priority, sequence, thread)
+        self.__sequence = itertools.count()
+
+        self.__owner = None
+        self.__depth = 0
+
+        self.__transactions = 0
+        self.__contended = 0
+        self.__wait_total = 0.0
+        self.__wait_max = 0.0
+
+    # ---------------------------------------------------------------------------------------------
+    def acquire( self, priority=I2C_Transaction_Priority.NORMAL ):
+        """! Begin transaction, waiting for the bus if needed
+        @param priority  transaction priority
+        """
+        me = get_ident()
+
+        with self.__cond:
+            if ( self.__owner == me ):
+                self.__depth += 1
+                return
+
+            # uncontended
+            if (( self.__owner is None ) and ( not self.__waiting )):
+                self.__owner = me
+                self.__depth = 1
+                self.__transactions += 1
+                return
+
+            start = time.monotonic()
+
+            ticket = (priority.value, next( self.__sequence ), me)
+            heapq.heappush( self.__waiting, ticket )
+
+            try:
+                while (( self.__owner is not None ) or ( self.__waiting[0] is not ticket )):
+                    self.__cond.wait()
+
+            # interrupted (e.g. KeyboardInterrupt); give up the place in line so later waiters
+            # are not blocked behind a ticket nobody will take
+            except BaseException:
+                self.__waiting.remove( ticket )
+                heapq.heapify( self.__waiting )
+
+                self.__cond.notify_all()
+                raise
+
+            heapq.heappop( self.__waiting )
+
+            self.__owner = me
+            self.__depth = 1
+
+            wait = time.monotonic() - start
+
+            self.__transactions += 1
+            self.__contended += 1
+            self.__wait_total += wait
+
+            if ( self.__wait_max < wait ):
+                self.__wait_max = wait
+
+    # ---------------------------------------------------------------------------------------------
+    def release( self ):
+        """! End transaction """
+        with self.__cond:
+            self.__depth -= 1
+
+            if ( 0 < self.__depth ):
+                return
+
+            self.__owner = None
+
+            if ( self.__waiting ):
+                self.__cond.notify_all()
+
+    # ---------------------------------------------------------------------------------------------
+    def statistics( self ):
+        """! Retrieve queue wait statistics
+        @return  statistics as (transactions, contended transactions, total wait (in s), max wait (in s))
+        """
+        with self.__cond:
+            return (self.__transactions, self.__contended, self.__wait_total, self.__wait_max)
+
+# =================================================================================================
+class I2C_Bus_Pool( object ):
+    """! Process-wide pool of reference counted SMBus handles
+
+    Every I2C device on the same bus shares one SMBus handle (and file descriptor) and one bus
+    arbiter. The handle is opened on first use and closed when the last device releases it.
+    """
+
+    # callable( bus ) returning a new SMBus handle, @c None to use the platform smbus module
+    factory = None
+
+    __lock = Lock()
+    __handles = {}                                  # [handle, arbiter, reference count] by bus number
+
+    # ---------------------------------------------------------------------------------------------
+    @staticmethod
+    def defaultBus():
+        """! Retrieve default bus number for this platform
+        @return  bus number
+        """
+        if ( sys.platform == 'uwp' ):
+            return 1
+
+        try:
+            import RPi.GPIO as GPIO
+            # use the bus that matches your raspi version
+            rev = GPIO.RPI_REVISION
+        except:
+            rev = 3
+
+        if (( rev == 2 ) or ( rev == 3 )):
+            return 1  # for Pi 2+
+
+        return 0
+
+    # ---------------------------------------------------------------------------------------------
+    @classmethod
+    def __open( cls, bus ):
+        """! Open new SMBus handle
+        @param bus  bus number
+        @return  handle
+        """
+        if ( cls.factory is not None ):
+            return cls.factory( bus )
+
+        if ( sys.platform == 'uwp' ):
+            import winrt_smbus as smbus
+        else:
+            import smbus
+
+        return smbus.SMBus( bus )
+
+    # ---------------------------------------------------------------------------------------------
+    @classmethod
+    def acquire( cls, bus ):
+        """! Acquire shared handle for bus
+        @param bus  bus number
+        @return  handle as (handle, arbiter)
+        """
+        cls.__lock.acquire()
+
+        try:
+            entry = cls.__handles.get( bus )
+
+            if ( entry is None ):
+                entry = [cls.__open( bus ), I2C_Bus_Arbiter(), 0]
+                cls.__handles[bus] = entry
+
+            entry[2] += 1
+
+        finally:
+            cls.__lock.release()
 
-__all__ = ['I2C_Device']
+        return (entry[0], entry[1])
+
+    # ---------------------------------------------------------------------------------------------
+    @classmethod
+    def release( cls, bus ):
+        """! Release shared handle for bus, closing it when no longer in use
+        @param bus  bus number
+        """
+        handle = None
+
+        cls.__lock.acquire()
+
+        try:
+            entry = cls.__handles.get( bus )
+
+            if ( entry is not None ):
+                entry[2] -= 1
+
+                if ( 0 >= entry[2] ):
+                    del cls.__handles[bus]
+                    handle = entry[0]
+
+        finally:
+            cls.__lock.release()
+
+        # close outside of lock
+        if (( handle is not None ) and hasattr( handle, 'close' )):
+            handle.close()
+
+    # ---------------------------------------------------------------------------------------------
+    @classmethod
+    def openHandles( cls ):
+        """! Retrieve open handles
+        @return  dictionary of reference count by bus number
+        """
+        cls.__lock.acquire()
+        result = dict( (bus, entry[2]) for (bus, entry) in cls.__handles.items() )
+        cls.__lock.release()
+
+        return result
 
 # =================================================================================================
 class I2C_Device( object ):
     """! Abstract I2C Device """
 
     # ---------------------------------------------------------------------------------------------
-    def __init__( self, i2c_address ):
+    def __init__( self, i2c_address, bus=None, priority=I2C_Transaction_Priority.NORMAL ):
         """! Initialize I2C Device
         @param i2c_address  i2c address
+        @param bus  bus number, @c None for platform default
+        @param priority  bus transaction priority
         """
 
+        self.__bus = None
+
         # retrieve bus
-        if ( sys.platform == 'uwp' ):
-            import winrt_smbus as smbus
+        if ( bus is None ):
+            bus = I2C_Bus_Pool.defaultBus()
 
-            bus = 1
+        self.__bus_number = bus
+        (self.__bus, self.__arbiter) = I2C_Bus_Pool.acquire( bus )
+        self.__address = i2c_address
+        self.__priority = priority
 
-        else:
-            import smbus
+    # ---------------------------------------------------------------------------------------------
+    def __del__( self ):
+        """! Finalize Class """
+        self.close()
 
-            try:
-                import RPi.GPIO as GPIO
-                # use the bus that matches your raspi version
-                rev = GPIO.RPI_REVISION
-            except:
-                rev = 3
-
-            if (( rev == 2 ) or ( rev == 3 )):
-                bus = 1  # for Pi 2+
-            else:
-                bus = 0
+    # ---------------------------------------------------------------------------------------------
+    def close( self ):
+        """! Release bus handle """
+        if ( self.__bus is None ):
+            return
 
-        self.__bus = smbus.SMBus( bus )
-        self.__address = i2c_address
+        self.__bus = None
+        I2C_Bus_Pool.release( self.__bus_number )
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def busNumber( self ):
+        """! Retrieve bus number
+        @return  bus number
+        """
+        return self.__bus_number
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def arbiter( self ):
+        """! Retrieve bus arbiter
+        @return  arbiter
+        """
+        return self.__arbiter
+
+    # ---------------------------------------------------------------------------------------------
+    @contextmanager
+    def transaction( self, priority=None ):
+        """! Hold the bus across several register accesses
+        @param priority  transaction priority, @c None for device priority
+        """
+        self.__arbiter.acquire( self.__priority if priority is None else priority )
+
+        try:
+            yield self
+
+        finally:
+            self.__arbiter.release()
 
     # ---------------------------------------------------------------------------------------------
     def readReg( self, reg ):
@@ -49,10 +304,16 @@ class I2C_Device( object ):
         @param reg  register
         @return  data
         """
-        if ( reg is None ):
-            return self.__bus.read_byte( self.__address )
+        self.__arbiter.acquire( self.__priority )
+
+        try:
+            if ( reg is None ):
+                return self.__bus.read_byte( self.__address )
 
-        return self.__bus.read_byte_data( self.__address, reg )
+            return self.__bus.read_byte_data( self.__address, reg )
+
+        finally:
+            self.__arbiter.release()
 
     # ---------------------------------------------------------------------------------------------
     def writeReg( self, reg, d ):
@@ -60,11 +321,17 @@ class I2C_Device( object ):
         @param reg  register
         @param d  data
         """
-        if ( reg is None ):
-            self.__bus.write_byte( self.__address, d )
-            return
+        self.__arbiter.acquire( self.__priority )
+
+        try:
+            if ( reg is None ):
+                self.__bus.write_byte( self.__address, d )
+                return
 
-        self.__bus.write_byte_data( self.__address, reg, d )
+            self.__bus.write_byte_data( self.__address, reg, d )
+
+        finally:
+            self.__arbiter.release()
 
     # ---------------------------------------------------------------------------------------------
     def readWordData( self, reg ):
@@ -72,7 +339,13 @@ class I2C_Device( object ):
         @param reg  register
         @return  data
         """
-        return self.__bus.read_word_data( self.__address, reg )
+        self.__arbiter.acquire( self.__priority )
+
+        try:
+            return self.__bus.read_word_data( self.__address, reg )
+
+        finally:
+            self.__arbiter.release()
 
     # ---------------------------------------------------------------------------------------------
     def writeWordData( self, reg, d ):
@@ -80,15 +353,27 @@ class I2C_Device( object ):
         @param reg  register
         @param d  data
         """
-        self.__bus.write_word_data( self.__address, reg, d )
+        self.__arbiter.acquire( self.__priority )
+
+        try:
+            self.__bus.write_word_data( self.__address, reg, d )
+
+        finally:
+            self.__arbiter.release()
 
     # ---------------------------------------------------------------------------------------------
     def readBlockData( self, reg, numbytes ):
         """! Read Block Data
         @param reg  register
-        @param numbytes  number of bytes to read  
+        @param numbytes  number of bytes to read
         """
-        return self.__bus.read_i2c_block_data( self.__address, reg, numbytes )
+        self.__arbiter.acquire( self.__priority )
+
+        try:
+            return self.__bus.read_i2c_block_data( self.__address, reg, numbytes )
+
+        finally:
+            self.__arbiter.release()
 
     # ---------------------------------------------------------------------------------------------
     def writeBlockData( self, reg, d ):
@@ -96,4 +381,171 @@ class I2C_Device( object ):
         @param reg  register
         @param d  data
         """
-        return self.__bus.write_i2c_block_data( self.__address, reg, d )
+        self.__arbiter.acquire( self.__priority )
+
+        try:
+            return self.__bus.write_i2c_block_data( self.__address, reg, d )
+
+        finally:
+            self.__arbiter.release()
+
+
+# =================================================================================================
+#
+# Test Cases
+#
+# =================================================================================================
+
+# -------------------------------------------------------------------------------------------------
+class I2C_Simulated_Bus( object ):
+    """! Simulated SMBus handle backed by register memory (for benchmarks)
+
+    Registers written as words are served by block reads as two little endian bytes, like the
+    Base Hat. Transactions and bytes on the wire are counted to estimate bus time.
+    """
+
+    OPEN_TIME = 0.0005                              # simulated cost of opening /dev/i2c-N
+
+    BIT_RATE = 100000                               # standard mode i2c clock (in Hz)
+
+    opened = 0
+    closed = 0
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self, bus ):
+        """! Initialize Class
+        @param bus  bus number
+        """
+        import time
+
+        time.sleep( self.OPEN_TIME )
+
+        I2C_Simulated_Bus.opened += 1
+
+        self.bus = bus
+        self.regs = {}                              # register values by (address, register)
+        self.words = set()                          # (address, register) of 16-bit registers
+
+        self.transactions = 0
+        self.wire_bytes = 0                         # address, register and data bytes
+
+    # ---------------------------------------------------------------------------------------------
+    def busTime( self ):
+        """! Estimate time spent on the wire, 9 clocks per byte
+        @return  bus time (in s)
+        """
+        return self.wire_bytes * 9.0 / self.BIT_RATE
+
+    # ---------------------------------------------------------------------------------------------
+    def __transfer( self, n ):
+        self.transactions += 1
+        self.wire_bytes += n
+
+    def close( self ):
+        I2C_Simulated_Bus.closed += 1
+
+    def read_byte( self, addr ):
+        self.__transfer( 2 )
+        return self.regs.get( (addr, None), 0 ) & 0xff
+
+    def read_byte_data( self, addr, reg ):
+        self.__transfer( 4 )
+        return self.regs.get( (addr, reg), 0 ) & 0xff
+
+    def write_byte( self, addr, d ):
+        self.__transfer( 2 )
+        self.regs[(addr, None)] = d
+
+    def write_byte_data( self, addr, reg, d ):
+        self.__transfer( 3 )
+        self.regs[(addr, reg)] = d
+        self.words.discard( (addr, reg) )
+
+    def read_word_data( self, addr, reg ):
+        self.__transfer( 5 )
+        return self.regs.get( (addr, reg), 0 ) & 0xffff
+
+    def write_word_data( self, addr, reg, d ):
+        self.__transfer( 4 )
+        self.regs[(addr, reg)] = d
+        self.words.add( (addr, reg) )
+
+    def read_i2c_block_data( self, addr, reg, numbytes ):
+        self.__transfer( 3 + numbytes )
+        data = []
+
+        while ( len( data ) < numbytes ):
+            value = self.regs.get( (addr, reg), 0 )
+
+            if ( (addr, reg) in self.words ):
+                data += [value & 0xff, (value >> 8) & 0xff]
+            else:
+                data.append( value & 0xff )
+
+            reg += 1
+
+        return data[:numbytes]
+
+    def write_i2c_block_data( self, addr, reg, d ):
+        self.__transfer( 2 + len( d ) )
+
+        for (i, v) in enumerate( d ):
+            self.regs[(addr, reg + i)] = v
+            self.words.discard( (addr, reg + i) )
+
+# -------------------------------------------------------------------------------------------------
+def main():
+    import time
+
+    # typical node; base hat, rgb lcd (two addresses), rtc, color sensor
+    addresses = (0x04, 0x3e, 0x62, 0x68, 0x29)
+
+    I2C_Bus_Pool.factory = I2C_Simulated_Bus
+
+    # unpooled; one handle per device
+    start = time.perf_counter()
+    handles = [I2C_Simulated_Bus( 1 ) for a in addresses]
+    elapsed = time.perf_counter() - start
+
+    print( 'Unpooled: {0} handles, startup {1:.3f} ms'.format( len( handles ), elapsed * 1000.0 ) )
+
+    # pooled
+    I2C_Simulated_Bus.opened = 0
+
+    start = time.perf_counter()
+    devices = [I2C_Device( a, 1 ) for a in addresses]
+    elapsed = time.perf_counter() - start
+
+    print( 'Pooled: {0} handles, startup {1:.3f} ms, references {2}'.format( I2C_Simulated_Bus.opened, elapsed * 1000.0, I2C_Bus_Pool.openHandles() ) )
+
+    for dev in devices:
+        dev.close()
+
+    print( 'Closed: {0} handles, open {1}'.format( I2C_Simulated_Bus.closed, I2C_Bus_Pool.openHandles() ) )
+
+    # contention; sensor sampling against display refresh
+    import threading
+
+    sensor = I2C_Device( 0x04, 1, I2C_Transaction_Priority.HIGH )
+    lcd = I2C_Device( 0x3e, 1, I2C_Transaction_Priority.LOW )
+
+    def refresh():
+        for i in range( 0, 2000 ):
+            with lcd.transaction():
+                for c in range( 0, 16 ):
+                    lcd.writeReg( 0x40, c )
+
+    t = threading.Thread( target=refresh )
+    t.start()
+
+    for i in range( 0, 2000 ):
+        sensor.readWordData( 0x30 )
+
+    t.join()
+
+    (count, contended, total, worst) = sensor.arbiter.statistics()
+    print( 'Arbiter: {0} transactions, {1} contended, avg wait {2:.3f} ms, max wait {3:.3f} ms'.format( count, contended, total * 1000.0 / max( contended, 1 ), worst * 1000.0 ) )
+
+# -------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,699 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/rblankley/rpi-grove/blob/master/LICENSE
+#
+
+from collections import namedtuple
+from threading import Lock
+
+import re
+
+__all__ = ['NMEA_GGA', 'NMEA_GSA', 'NMEA_GSV', 'NMEA_RMC', 'NMEA_VTG', 'nmea_checksum', 'NMEA_Parser']
+
+# GGA Global positioning system fixed data
+NMEA_GGA = namedtuple( 'NMEA_GGA', 'talker utc latitude longitude position satellites hdop altitude geoids' )
+
+# GSA GNSS DOP and Active Satellites; system is the NMEA 4.10 GNSS system id, @c None if absent
+NMEA_GSA = namedtuple( 'NMEA_GSA', 'talker mode fix satellites pdop hdop vdop system' )
+
+# GSV GNSS Satellites in View; satellites as tuple of (id, elevation, azinmuth, snr)
+NMEA_GSV = namedtuple( 'NMEA_GSV', 'talker messages message in_view satellites' )
+
+# RMC Recommended Minimum Specific GNSS Data
+NMEA_RMC = namedtuple( 'NMEA_RMC', 'talker utc valid latitude longitude speed course date' )
+
+# VTG Course Over Ground and Ground Speed
+NMEA_VTG = namedtuple( 'NMEA_VTG', 'talker heading speed' )
+
+# folding masks for checksum; widths in bytes
+_FOLD_MASKS = tuple( (w, (1 << (8 * w)) - 1) for w in (256, 128, 64, 32, 16, 8, 4, 2, 1) )
+
+# =================================================================================================
+class _Integer_Fields( dict ):
+    """! Integer field values by field text
+    Satellite ids, elevations, azinmuths and SNRs are short decimal fields; looking them up is
+    cheaper than converting each with int(). Fields not in the table are converted.
+    """
+
+    # ---------------------------------------------------------------------------------------------
+    def __missing__( self, field ):
+        """! Convert field not in table
+        @param field  decimal field
+        @return  value
+        """
+        return int( field )
+
+# integer of every decimal field of up to 3 digits, including leading zeros; empty fields are None
+_INTEGERS = _Integer_Fields( ('%0*d' % (w, v), v) for w in (1, 2, 3) for v in range( 0, 10 ** w ) )
+_INTEGERS[''] = None
+
+# checksum by its two hex digits
+_CHECKSUMS = dict( [('%02X' % v, v) for v in range( 0, 256 )] + [('%02x' % v, v) for v in range( 0, 256 )] )
+
+# -------------------------------------------------------------------------------------------------
+def nmea_checksum( data ):
+    """! Compute NMEA checksum
+    The bytes are XORed together by folding them as one integer in halves, which takes a handful of
+    integer operations instead of one per byte.
+    @param data  bytes between '$' and '*' (at most 512)
+    @return  checksum
+    """
+    x = int.from_bytes( data, 'little' )
+    n = len( data )
+
+    for (width, mask) in _FOLD_MASKS:
+        if ( width < n ):
+            x = (x >> (8 * width)) ^ (x & mask)
+            n = width
+
+    return x
+
+# -------------------------------------------------------------------------------------------------
+def _degrees( value, hemisphere ):
+    """! Convert NMEA position to degrees
+    @param value  position ddmm.mmmmm
+    @param hemisphere  hemisphere indicator
+    @return  degrees, negative for south and west; @c None if empty
+    """
+    if ( not value ):
+        return None
+
+    value = float( value )
+    result = value // 100 + value % 100 / 60
+
+    if (( hemisphere == 'S' ) or ( hemisphere == 'W' )):
+        result = -result
+
+    return result
+
+# =================================================================================================
+class NMEA_Parser( object ):
+    """! Single pass NMEA sentence parser
+
+    The sentence type is looked up once for any talker, the checksum verified, then all fields are
+    validated by one precompiled regex per sentence type and converted in one pass. Valid
+    sentences are returned as typed records.
+    """
+
+    DEBUG = False
+
+    # reject sentences without checksum
+    REQUIRE_CHECKSUM = True
+
+    # field specifications as regex per field; record builders convert the fields they use
+    # position, DOP, course and speed fields are empty while the receiver has no fix
+    GGA = (
+        r'[0-9]{6}(?:\.[0-9]+)?|',                  # UTC Position (timestamp) hhmmss.sss
+        r'[0-9.]*',                                 # Latitude of position ddmm.mmmmm
+        r'[NS]?',                                   # North or South Indicator
+        r'[0-9.]*',                                 # Longitude of position ddmm.mmmmm
+        r'[EW]?',                                   # East or West Indicator
+        r'[0-8]',                                   # GPS Position Indicator; 0=Fix not available or invalid, 1=GPS SPS Mode, fix valid, 2=Differential GPS, SPS Mode, fix valid, 3=GPS PPS Mode, fix valid
+        r'[0-9]{0,2}',                              # Number of Satellites Used
+        r'[0-9.]*',                                 # Horizontal Dilution of Precision x.x
+        r'-?[0-9.]*',                               # MSL Altitude x.x (meters)
+        r'\w?',                                     # MSL Altitude units
+        r'-?[0-9.]*',                               # Geoids Separation x.x (meters)
+        r'\w?',                                     # Geoids Separation units
+        )
+
+    GSA = (
+        r'[MA]',                                    # Mode 1; M=Manual-forced to operate in 2D or 3D mode, A=Automatic-allowed to automatically switch 2D/3D
+        r'[123]',                                   # Mode 2; 1=Fix not available, 2=3D, 3=3D
+        ) + (r'[0-9]*',) * 12 + (                   # Satellite Used on Channel 1-12
+        r'[0-9.]*',                                 # Position Dilution of Precision x.x
+        r'[0-9.]*',                                 # Horizontal Dilution of Precision x.x
+        r'[0-9.]*',                                 # Vertical Dilution of Precision x.x
+        )
+
+    # NMEA 4.10 and later
+    GSA_SYSTEM = (
+        r'[0-9A-F]',                                # GNSS System ID; 1=GPS, 2=GLONASS, 3=Galileo, 4=BeiDou, 5=QZSS, 6=NavIC
+        )
+
+    GSV = (
+        r'[1-9]',                                   # Number of Messages
+        r'[1-9]',                                   # Messages Number
+        r'[0-9]{1,2}',                              # Number of Satellites Used
+        )
+
+    # repeated for up to 4 satellites; unused satellites may not contain elevation, azinmuth, snr
+    GSV_SATELLITE = (
+        r'[0-9]{1,3}',                              # Satellite ID
+        r'[0-9]*',                                  # Satellite Elevation (degrees, max 90)
+        r'[0-9]*',                                  # Satellite Azinmuth (degrees true, 0-359)
+        r'[0-9]*',                                  # SNR(C/NO) dBHz (0-99, null when not tracking)
+        )
+
+    RMC = (
+        r'[0-9]{6}(?:\.[0-9]+)?|',                  # UTC Position (timestamp) hhmmss.sss
+        r'[AV]',                                    # Status; A=data valid, V=data not valid
+        r'[0-9.]*',                                 # Latitude of position ddmm.mmmmm
+        r'[NS]?',                                   # North or South Indicator
+        r'[0-9.]*',                                 # Longitude of position ddmm.mmmmm
+        r'[EW]?',                                   # East or West Indicator
+        r'[0-9.]*',                                 # Speed Over Ground (knots)
+        r'[0-9.]*',                                 # Course Over Ground Heading (degrees true)
+        r'[0-9]{6}|',                               # Date ddmmyy
+        )
+
+    VTG = (
+        r'[0-9.]*',                                 # Measured Heading (degrees true)
+        r'T?',                                      # True
+        r'[0-9.]*',                                 # Measured Heading magnetic (degrees magnetic)
+        r'M?',                                      # Magnetic
+        r'[0-9.]*',                                 # Measured Horizontal Speed (knots)
+        r'N?',                                      # Knots
+        r'[0-9.]*',                                 # Measured Horizontal Speed (kilometers)
+        r'K?',                                      # Kilometers / hr
+        )
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self ):
+        """! Initialize Class """
+
+        # (fields regex match function, record builder, counts) by sentence type, for any talker
+        self.__sentences = {
+            'GGA': self.__compile( self.GGA, (), self.__gga ),
+            'GSA': self.__compile( self.GSA, (self.GSA_SYSTEM,), self.__gsa ),
+            'GSV': self.__compile( self.GSV, (self.GSV_SATELLITE,) * 4, self.__gsv ),
+            'RMC': self.__compile( self.RMC, (), self.__rmc ),
+            'VTG': self.__compile( self.VTG, (), self.__vtg ),
+        }
+
+        self.__unknown = 0
+
+    # ---------------------------------------------------------------------------------------------
+    @staticmethod
+    def __compile( spec, optional, build ):
+        """! Compile field specification into a single regex over all fields, each preceded by its
+        separator
+        @param spec  field specification
+        @param optional  field specifications of trailing optional field groups
+        @param build  record builder
+        @return  sentence as (fields regex match function, record builder, counts) where counts
+                 is [accepted, checksum errors, format errors]
+        """
+        exp = ''.join( ',({0})'.format( p ) for p in spec )
+
+        for group in optional:
+            exp += '(?:,' + ','.join( '({0})'.format( p ) for p in group ) + ')?'
+
+        # ignore any additional fields
+        exp += '(?:,.*)?'
+
+        return (re.compile( exp ).fullmatch, build, [0, 0, 0])
+
+    # ---------------------------------------------------------------------------------------------
+    def __debug( self, s ):
+        """! Print debug statement
+        @param s  statement
+        """
+        if ( self.DEBUG ):
+            print( s )
+
+    # ---------------------------------------------------------------------------------------------
+    def parse( self, line ):
+        """! Parse sentence
+        @param line  sentence to parse
+        @return  record, @c None if unknown sentence or the sentence is mangled
+        """
+
+        # sometimes multiple GPS data packets come into the stream... take the data only after the last one
+        i = line.rfind( '$' )
+
+        if ( i < 0 ):
+            return None
+
+        # dispatch on sentence type; talker (GP, GL, GA, BD, GN, ...) is passed through to the record
+        ident = line[i + 3:i + 6]
+        entry = self.__sentences.get( ident )
+
+        if ( entry is None ):
+            self.__unknown += 1
+            return None
+
+        (match, build, counts) = entry
+
+        # verify checksum
+        end = line.find( '*', i )
+
+        if ( end < 0 ):
+            if ( self.REQUIRE_CHECKSUM ):
+                self.__debug( 'Failed: missing checksum {0}'.format( line ) )
+                counts[1] += 1
+                return None
+
+            # serial devices pass lines with their carriage return
+            end = len( line.rstrip( '\r\n' ) )
+
+        else:
+            if ( _CHECKSUMS.get( line[end + 1:end + 3], -1 ) != nmea_checksum( line[i + 1:end].encode( 'latin-1', 'replace' ) ) ):
+                self.__debug( 'Failed: checksum {0}'.format( line ) )
+                counts[1] += 1
+                return None
+
+        # fields regex starts at the separator after the address
+        m = match( line, i + 6, end )
+
+        record = None
+
+        if ( m is not None ):
+            try:
+                record = build( line[i + 1:i + 3], m.groups() )
+
+            # decimal fields such as '1.2.3'
+            except ValueError:
+                pass
+
+        if ( record is None ):
+            self.__debug( 'Failed: wrong format {0}'.format( line ) )
+            counts[2] += 1
+            return None
+
+        counts[0] += 1
+        return record
+
+    # ---------------------------------------------------------------------------------------------
+    def statistics( self ):
+        """! Retrieve sentence statistics
+        @return  dictionary of (accepted, checksum errors, format errors) by sentence type; sentences
+                 of a receiver without a fix (empty position fields) are accepted, so errors count
+                 only corrupted or malformed sentences
+        """
+        return dict( (ident, tuple( entry[2] )) for (ident, entry) in self.__sentences.items() )
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def unknown( self ):
+        """! Retrieve number of ignored sentences of unknown type
+        @return  number of sentences
+        """
+        return self.__unknown
+
+    # ---------------------------------------------------------------------------------------------
+    @staticmethod
+    def __gga( talker, g ):
+        """! Build GGA record from fields """
+        return NMEA_GGA( talker,
+            float( g[0] ) if g[0] else None,
+            _degrees( g[1], g[2] ),
+            _degrees( g[3], g[4] ),
+            _INTEGERS[g[5]],
+            _INTEGERS[g[6]],
+            float( g[7] ) if g[7] else None,
+            float( g[8] ) if g[8] else None,
+            float( g[10] ) if g[10] else None )
+
+    # ---------------------------------------------------------------------------------------------
+    @staticmethod
+    def __gsa( talker, g ):
+        """! Build GSA record from fields """
+        return NMEA_GSA( talker, g[0], _INTEGERS[g[1]],
+            tuple( [_INTEGERS[s] for s in g[2:14] if s] ),
+            float( g[14] ) if g[14] else None,
+            float( g[15] ) if g[15] else None,
+            float( g[16] ) if g[16] else None,
+            int( g[17], 16 ) if g[17] else None )
+
+    # ---------------------------------------------------------------------------------------------
+    @staticmethod
+    def __gsv( talker, g ):
+        """! Build GSV record from fields """
+        n = _INTEGERS
+
+        satellites = tuple( [(n[g[i]], n[g[i + 1]], n[g[i + 2]], n[g[i + 3]]) for i in (3, 7, 11, 15) if g[i] is not None] )
+
+        return NMEA_GSV( talker, n[g[0]], n[g[1]], n[g[2]], satellites )
+
+    # ---------------------------------------------------------------------------------------------
+    @staticmethod
+    def __rmc( talker, g ):
+        """! Build RMC record from fields """
+        return NMEA_RMC( talker,
+            float( g[0] ) if g[0] else None,
+            'A' == g[1],
+            _degrees( g[2], g[3] ),
+            _degrees( g[4], g[5] ),
+            float( g[6] ) if g[6] else None,
+            float( g[7] ) if g[7] else None,
+            int( g[8] ) if g[8] else None )
+
+    # ---------------------------------------------------------------------------------------------
+    @staticmethod
+    def __vtg( talker, g ):
+        """! Build VTG record from fields """
+        return NMEA_VTG( talker, float( g[0] ) if g[0] else None, float( g[4] ) if g[4] else None )
+
+
+# =================================================================================================
+#
+# Test Cases
+#
+# =================================================================================================
+
+SAMPLE = (
+    '$GPGGA,064951.000,2307.1256,N,12016.4438,E,1,8,0.95,39.9,M,17.8,M,,*63',
+    '$GPGSA,A,3,29,21,26,15,18,09,06,10,,,,,2.32,0.95,2.11*00',
+    '$GPGSV,3,1,09,29,36,029,42,21,46,314,43,26,44,020,43,15,21,321,39*7D',
+    '$GPGSV,3,2,09,18,26,314,40,09,57,170,44,06,20,229,37,10,26,084,37*77',
+    '$GPGSV,3,3,09,07,,,26*73',
+    '$GPRMC,064951.000,A,2307.1256,N,12016.4438,E,0.03,165.48,260406,3.05,W,A*2C',
+    '$GPVTG,165.48,T,,M,0.03,N,0.06,K,A*36',
+    )
+
+# =================================================================================================
+class Legacy_GPS( object ):
+    """! Sentence processing of Grove_GPS before NMEA_Parser, kept verbatim as benchmark baseline;
+    validates each field of each sentence type in turn, then splits the sentence again to convert it
+    """
+
+    DEBUG = False
+
+    GPGGA = ["$GPGGA",
+        r"[0-9]{6}\.[0-9]{3}",                      # UTC Position (timestamp) hhmmss.sss
+        r"[0-9]+\.[0-9]{2,}",                       # Latitude of position ddmm.mmmmm
+        r"[NS]{1}",                                 # North or South Indicator
+        r"[0-9]+\.[0-9]{2,}",                       # Longitude of position ddmm.mmmmm
+        r"[EW]{1}",                                 # East or West Indicator
+        r"[0123]",                                  # GPS Position Indicator
+        r"[0-9]{1,2}",                              # Number of Satellites Used
+        r"[0-9]+\.[0-9]*",                          # Horizontal Dilution of Precision x.x
+        r"[0-9]+\.[0-9]*",                          # MSL Altitude x.x (meters)
+        r"\w",                                      # MSL Altitude units
+        r"-?[0-9]+\.[0-9]*",                        # Geoids Separation x.x (meters)
+        r"\w",                                      # Geoids Separation units
+        ]
+
+    GPGSA = ["$GPGSA",
+        r"[MA]{1}",                                 # Mode 1
+        r"[123]{1}",                                # Mode 2
+        ] + [r"[0-9]*"] * 12 + [                    # Satellite Used on Channel 1-12
+        r"[0-9]+\.[0-9]*",                          # Position Dilution of Precision x.x
+        r"[0-9]+\.[0-9]*",                          # Horizontal Dilution of Precision x.x
+        r"[0-9]+\.[0-9]*",                          # Vertical Dilution of Precision x.x
+        ]
+
+    GPGSV = ["$GPGSV",
+        r"[1-9]{1}",                                # Number of Messages
+        r"[1-9]{1}",                                # Messages Number
+        r"[0-9]{1,2}",                              # Number of Satellites Used
+        r"[0-9]{1,2}",                              # Channel 1 Satellite ID (1-32)
+        r"[0-9]{1,2}",                              # Channel 1 Satellite Elevation (degrees, max 90)
+        r"[0-9]{1,3}",                              # Channel 1 Satellite Azinmuth (degrees true, 0-359)
+        r"[0-9]*",                                  # Channel 1 SNR(C/NO) dBHz (0-99, null when not tracking)
+        ]
+
+    GPRMC = ["$GPRMC",
+        r"[0-9]{6}\.[0-9]{3}",                      # UTS Position (timestamp) hhmmss.sss
+        r"[AV]{1}",                                 # Status; A=data valid, V=data not valid
+        r"[0-9]+\.[0-9]{2,}",                       # Latitude of position ddmm.mmmmm
+        r"[NS]{1}",                                 # North or South Indicator
+        r"[0-9]+\.[0-9]{2,}",                       # Longitude of position ddmm.mmmmm
+        r"[EW]{1}",                                 # East or West Indicator
+        r"[0-9]+\.[0-9]*",                          # Speed Over Ground (knots)
+        r"[0-9]+\.[0-9]*",                          # Course Over Ground Heading (degrees true)
+        r"[0-9]{6}",                                # Date ddmmyy
+        ]
+
+    GPVTG = ["$GPVTG",
+        r"[0-9]+\.[0-9]*",                          # Measured Heading (degrees true)
+        r"[T]{1}",                                  # True
+        r"[0-9]+\.[0-9]*",                          # Measured Heading magnetic (degrees magnetic)
+        r"[M]{1}",                                  # Magnetic
+        r"[0-9]+\.[0-9]*",                          # Measured Horizontal Speed (knots)
+        r"[N]{1}",                                  # Knots
+        r"[0-9]+\.[0-9]*",                          # Measured Horizontal Speed (kilometers)
+        r"[K]{1}",                                  # Kilometers / hr
+        ]
+
+    KNOTS_TO_KM_HR = 1.852
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self ):
+        """! Initialize Class """
+        self.__gga = [re.compile( p ) for p in self.GPGGA]
+        self.__gsa = [re.compile( p ) for p in self.GPGSA]
+        self.__gsv = [re.compile( p ) for p in self.GPGSV]
+        self.__gsv_lines = []
+        self.__rmc = [re.compile( p ) for p in self.GPRMC]
+        self.__vtg = [re.compile( p ) for p in self.GPVTG]
+
+        # default values
+        self.__timestamp = 0.0
+        self.__latitude = 0.0
+        self.__longitude = 0.0
+        self.__pos = 0
+        self.__satellites = 0
+        self.__altitude = 0.0
+        self.__geoids = 0.0
+
+        self.__satellitesUsed = []
+        self.__pdop = 0.0
+        self.__hdop = 0.0
+        self.__vdop = 0.0
+
+        self.__satellitesUsedInfo = {}
+
+        self.__heading = 0.0
+        self.__velocity = 0.0
+
+        self.__date = 0
+
+        self.__lock = Lock()
+
+    # ---------------------------------------------------------------------------------------------
+    def __debug( self, s ):
+        """! Print debug statement
+        @param s  statement
+        """
+        if ( self.DEBUG ):
+            print( s )
+
+    # ---------------------------------------------------------------------------------------------
+    def __split( self, ident, line ):
+        """! Split lines on separator
+        @param ident  identifier
+        @param line  line to split
+        @return  array of lines
+        """
+
+        # sometimes multiple GPS data packets come into the stream... take the data only after the last ident is seen
+        i = line.rindex( ident )
+        line = line[i:]
+
+        lines = line.split( "," )
+
+        # look for checksum and strip
+        checksum = lines[-1]
+
+        if ( "*" in checksum ):
+            i = checksum.index( "*" )
+            lines[-1] = checksum[:i]
+
+        return lines
+
+    # ---------------------------------------------------------------------------------------------
+    def __validate_expression( self, ident, line, exp ):
+        """! Runs regex validation on a line
+        @param ident  identifier
+        @param line  line to parse
+        @param exp  regex
+        @return  @c True if everything is all right, @c False if the sentence is mangled
+        """
+        if ( not line.startswith( ident ) ):
+            return False
+
+        lines = self.__split( ident, line )
+        self.__debug( lines )
+
+        if ( len(lines) < len(exp) ):
+            self.__debug( "Failed: wrong number of parameters " )
+            self.__debug( exp )
+            return False
+
+        for i in range( 1, len(exp) ):
+            if ( not exp[i].match( lines[i] ) ):
+                self.__debug( "Failed: wrong format on parameter %d" % i )
+                return False
+            else:
+                self.__debug( "Passed %d" % i )
+
+        return True
+
+    # ---------------------------------------------------------------------------------------------
+    def __process_gsv( self ):
+        """! Process GSV line data """
+        self.__satellitesUsedInfo = {}
+
+        # process each line
+        for line in self.__gsv_lines:
+            lines = self.__split( self.GPGSV[0], line )
+
+            # retrieve satellite info
+            # message may contain up to 4 satellites
+            for i in (4, 8, 12, 16):
+                if ( i < len(lines) ):
+                    sat_id = int( lines[i] )
+
+                    if ( 0 < sat_id ):
+                        values = []
+
+                        # unused satellites may not contain elevation, azinmuth, snr
+                        for j in range( 1, 4 ):
+                            if ( len( lines[i+j] ) ):
+                                values.append( int( lines[i+j] ) )
+                            else:
+                                values.append( None )
+
+                        # (elevation, azinmuth, snr)
+                        self.__satellitesUsedInfo[sat_id] = (values[0], values[1], values[2])
+
+        self.__satellites = len( self.__satellitesUsedInfo )
+
+    # ---------------------------------------------------------------------------------------------
+    def process_command( self, line ):
+        """! Process command
+        @param line  command to process
+        """
+        if ( not len( line ) ):
+            return
+
+        self.__lock.acquire()
+        self.__debug( line )
+
+        # gga
+        if ( self.__validate_expression( self.GPGGA[0], line, self.__gga ) ):
+            lines = self.__split( self.GPGGA[0], line )
+
+            self.__timestamp = float( lines[1] )
+
+            lat = float( lines[2] )
+            NS = lines[3]
+
+            self.__latitude = lat // 100 + lat % 100 / 60
+            if ( NS == "S" ):
+                self.__latitude *= -1.0
+
+            lon = float( lines[4] )
+            EW = lines[5]
+
+            self.__longitude = lon // 100 + lon % 100 / 60
+            if ( EW == "W" ):
+                self.__longitude = -self.__longitude
+
+            self.__pos = int( lines[6] )
+            self.__satellites = int( lines[7] )
+            self.__hdop = float( lines[8] )
+            self.__altitude = float( lines[9] )
+            self.__geoids = float( lines[11] )
+
+        # gsa
+        elif ( self.__validate_expression( self.GPGSA[0], line, self.__gsa ) ):
+            lines = self.__split( self.GPGSA[0], line )
+
+            if ( '1' == lines[2] ):
+                self.__debug( "Fix not available" )
+
+            else:
+                self.__satellitesUsed = []
+
+                for s in lines[3:15]:
+                    if ( len(s ) ):
+                        self.__satellitesUsed.append( int( s ) )
+
+                self.__pdop = float( lines[15] )
+                self.__hdop = float( lines[16] )
+                self.__vdop = float( lines[17] )
+
+        # gsv
+        elif ( self.__validate_expression( self.GPGSV[0], line, self.__gsv ) ):
+            lines = self.__split( self.GPGSV[0], line )
+
+            num_gsv = int( lines[1] )
+            gsv_index = int( lines[2] ) - 1
+
+            # save off all lines
+            # process them all once we have all of them
+            if ( 0 == gsv_index ):
+                self.__gsv_lines = []
+
+            self.__gsv_lines.append( line )
+
+            # we have all lines
+            if ( num_gsv == len( self.__gsv_lines ) ):
+                self.__process_gsv()
+
+        # rmc
+        elif ( self.__validate_expression( self.GPRMC[0], line, self.__rmc ) ):
+            lines = self.__split( self.GPRMC[0], line )
+
+            if ( 'A' != lines[2] ):
+                self.__debug( "RMC data not valid" )
+
+            else:
+                self.__velocity = float( lines[7] ) * self.KNOTS_TO_KM_HR
+                self.__heading = float( lines[8] )
+                self.__date = float( lines[9] )
+
+        # vtg
+        elif ( self.__validate_expression( self.GPVTG[0], line, self.__vtg ) ):
+            lines = self.__split( self.GPVTG[0], line )
+
+            self.__heading = float( lines[1] )
+            self.__velocity = float( lines[5] ) * self.KNOTS_TO_KM_HR
+
+        self.__lock.release()
+
+# -------------------------------------------------------------------------------------------------
+def main():
+    import sys
+    import time
+
+    from grove_gps_module import Grove_GPS
+
+    # recorded log, or built-in sample
+    if ( 1 < len( sys.argv ) ):
+        with open( sys.argv[1], 'r', errors='replace' ) as f:
+            lines = [l.rstrip( '\r\n' ) for l in f if l.strip()]
+    else:
+        lines = list( SAMPLE ) * 20000
+
+    legacy = Legacy_GPS()
+    parser = NMEA_Parser()
+
+    def before():
+        process = legacy.process_command
+
+        for line in lines:
+            process( line )
+
+    def after():
+        for fix in Grove_GPS( port=None ).ingest( lines ):
+            pass
+
+    def parse():
+        for line in lines:
+            parser.parse( line )
+
+    # best of several interleaved runs; single runs vary widely on a loaded system
+    runs = (before, after, parse)
+    elapsed = dict( (run, []) for run in runs )
+
+    for i in range( 0, 7 ):
+        for run in runs:
+            start = time.perf_counter()
+            run()
+            elapsed[run].append( time.perf_counter() - start )
+
+    rate = dict( (run, len( lines ) / min( elapsed[run] )) for run in runs )
+
+    print( '{0} sentences, best of 7: before {1:.0f} sentences/s, after {2:.0f} sentences/s ({3:+.0%}), of which parsing {4:.0f} sentences/s'.format(
+        len( lines ), rate[before], rate[after], rate[after] / rate[before] - 1.0, rate[parse] ) )
+    print( 'statistics (accepted, checksum errors, format errors)', parser.statistics() )
+
+# -------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()
@@ -5,22 +5,96 @@
 # For more information see https://github.com/rblankley/rpi-grove/blob/master/LICENSE
 #
 
-from grove_ports import Grove_Digital_Port_Direction
+from collections import deque
+from grove_ports import Grove_Digital_Port_Direction, Grove_Digital_Port_Edge
 
-import RPi.GPIO
+import functools
+import time
 
-__all__ = ['GPIO_Device']
+try:
+    import RPi.GPIO
+except ImportError:
+    RPi = None
 
-RPi.GPIO.setwarnings( False )
-RPi.GPIO.setmode( RPi.GPIO.BCM )
+__all__ = ['GPIO_Simulated_Backend', 'GPIO_Device', 'GPIO_Port_Group']
+
+if ( RPi is not None ):
+    RPi.GPIO.setwarnings( False )
+    RPi.GPIO.setmode( RPi.GPIO.BCM )
+
+# =================================================================================================
+class GPIO_Simulated_Backend( object ):
+    """! Simulated RPi.GPIO backend holding pin levels in memory; usable without RPi.GPIO """
+
+    # same values as RPi.GPIO
+    IN = 1
+    OUT = 0
+
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self ):
+        """! Initialize Class """
+        self.directions = {}                        # direction by pin
+        self.levels = {}                            # level by pin
+
+    # ---------------------------------------------------------------------------------------------
+    def setup( self, channel, direction ):
+        """! Set pin direction
+        @param channel  pin or list of pins
+        @param direction  direction
+        """
+        if ( not isinstance( channel, (list, tuple) ) ):
+            channel = (channel,)
+
+        for pin in channel:
+            self.directions[pin] = direction
+
+    # ---------------------------------------------------------------------------------------------
+    def output( self, channel, value ):
+        """! Write pins
+        @param channel  pin or list of pins
+        @param value  value or list of values
+        """
+        if ( not isinstance( channel, (list, tuple) ) ):
+            channel = (channel,)
+
+        if ( not isinstance( value, (list, tuple) ) ):
+            value = (value,) * len( channel )
+
+        for (pin, v) in zip( channel, value ):
+            self.levels[pin] = 1 if v else 0
+
+    # ---------------------------------------------------------------------------------------------
+    def input( self, channel ):
+        """! Read pin
+        @param channel  pin
+        @return  pin value
+        """
+        return self.levels.get( channel, 0 )
 
 # =================================================================================================
 class GPIO_Device( object ):
-    """! Abstract GPIO Device for Raspberry Pi """
+    """! Abstract GPIO Device for Raspberry Pi (requires RPi.GPIO) """
 
     PIN_DIRS = {
-        Grove_Digital_Port_Direction.INPUT: RPi.GPIO.IN,
-        Grove_Digital_Port_Direction.OUTPUT: RPi.GPIO.OUT,
+        Grove_Digital_Port_Direction.INPUT: GPIO_Simulated_Backend.IN,
+        Grove_Digital_Port_Direction.OUTPUT: GPIO_Simulated_Backend.OUT,
+    }
+
+    PIN_EDGES = {
+        Grove_Digital_Port_Edge.RISING: GPIO_Simulated_Backend.RISING,
+        Grove_Digital_Port_Edge.FALLING: GPIO_Simulated_Backend.FALLING,
+        Grove_Digital_Port_Edge.BOTH: GPIO_Simulated_Backend.BOTH,
+    }
+
+    # level seen after edge, @c None for any
+    EDGE_LEVELS = {
+        Grove_Digital_Port_Edge.RISING: 1,
+        Grove_Digital_Port_Edge.FALLING: 0,
+        Grove_Digital_Port_Edge.BOTH: None,
     }
 
     # ---------------------------------------------------------------------------------------------
@@ -29,6 +103,9 @@ class GPIO_Device( object ):
         @param pin  gpio pin number (BCM)
         @param direction  port direction
         """
+        if ( RPi is None ):
+            raise ImportError( 'GPIO_Device requires the RPi.GPIO module' )
+
         self.pin = pin
         self.direction = None
 
@@ -36,15 +113,149 @@ class GPIO_Device( object ):
             self.pinMode( direction )
 
         self.__event_handle = None
+        self.__event_detect = None
+
+        # level implied by the detected edge, @c None when both edges are detected
+        self.__detect_level = None
+
+        # debounce
+        self.__settle_ns = 0
+        self.__event_edge = Grove_Digital_Port_Edge.BOTH
+        self.__event_level = None
+        self.__last_edge = 0
+        self.__last_level = None
+
+        # edge counter
+        self.__counting = False
+        self.__count_edge = None
+        self.__count_level = None
+        self.__count = 0
+        self.__count_first = 0
+        self.__count_last = 0
+
+        # edge event queue
+        self.__events = None
+        self.__events_size = 0
+        self.__events_edge = None
+        self.__events_level = None
+        self.__events_dropped = 0
 
     # ---------------------------------------------------------------------------------------------
     def __on_event( self, pin ):
         """! Pin Event Handler
         @param pin  gpio pin number (BCM)
         """
-        value = self.read()
-        if ( self.__event_handle ):
-            self.__event_handle( pin, value )
+        timestamp = time.monotonic_ns()
+
+        # a single detected edge implies the level; reading the pin back would lose pulses
+        # shorter than the callback latency
+        value = self.__detect_level
+
+        if ( value is None ):
+            value = RPi.GPIO.input( pin )
+
+        # debounce
+        if ( self.__settle_ns ):
+            if (( timestamp - self.__last_edge < self.__settle_ns ) or (( self.__detect_level is None ) and ( value == self.__last_level ))):
+                return
+
+            self.__last_edge = timestamp
+            self.__last_level = value
+
+        if ( self.__counting ):
+            level = self.__count_level
+
+            if (( level is None ) or ( level == value )):
+                self.__on_count_edge( timestamp )
+
+        level = self.__event_level
+
+        if (( level is not None ) and ( level != value )):
+            return
+
+        events = self.__events
+
+        if ( events is not None ):
+            level = self.__events_level
+
+            if (( level is None ) or ( level == value )):
+                if ( len( events ) < self.__events_size ):
+                    events.append( (timestamp, value) )
+                else:
+                    self.__events_dropped += 1
+
+        handle = self.__event_handle
+
+        if ( handle ):
+            handle( pin, value )
+
+    # ---------------------------------------------------------------------------------------------
+    def __on_count( self, pin ):
+        """! Pin Event Handler (counting only)
+        @param pin  gpio pin number (BCM)
+        """
+        timestamp = time.monotonic_ns()
+
+        # debounce
+        if ( timestamp - self.__count_last < self.__settle_ns ):
+            return
+
+        self.__on_count_edge( timestamp )
+
+    # ---------------------------------------------------------------------------------------------
+    def __on_count_edge( self, timestamp ):
+        """! Count edge
+        @param timestamp  monotonic timestamp (in ns)
+        """
+        if ( not self.__count ):
+            self.__count_first = timestamp
+
+        self.__count += 1
+        self.__count_last = timestamp
+
+    # ---------------------------------------------------------------------------------------------
+    def __update_event_detect( self ):
+        """! Register edge detection needed by event consumers """
+        if (( self.__event_handle is not None ) or ( self.__events is not None )):
+            edges = set()
+
+            if ( self.__events is not None ):
+                edges.add( self.__events_edge )
+            if ( self.__counting ):
+                edges.add( self.__count_edge )
+            if (( self.__event_handle is not None ) or ( self.__settle_ns )):
+                edges.add( self.__event_edge )
+
+            # detect both edges only when consumers need different ones
+            detect = (edges.pop() if ( 1 == len( edges ) ) else Grove_Digital_Port_Edge.BOTH, self.__on_event)
+        elif ( self.__counting ):
+            detect = (self.__count_edge, self.__on_count)
+        else:
+            detect = None
+
+        # let RPi.GPIO reject bounces of a millisecond or more before calling back
+        bouncetime = self.__settle_ns // 1000000
+
+        if ( detect is not None ):
+            detect += (bouncetime,)
+
+        if ( detect == self.__event_detect ):
+            return
+
+        if ( self.__event_detect is not None ):
+            RPi.GPIO.remove_event_detect( self.pin )
+
+        if ( detect is not None ):
+            (edge, callback, bouncetime) = detect
+
+            if ( bouncetime ):
+                RPi.GPIO.add_event_detect( self.pin, self.PIN_EDGES[edge], callback, bouncetime=bouncetime )
+            else:
+                RPi.GPIO.add_event_detect( self.pin, self.PIN_EDGES[edge], callback )
+
+            self.__detect_level = self.EDGE_LEVELS[edge]
+
+        self.__event_detect = detect
 
     # ---------------------------------------------------------------------------------------------
     def pinMode( self, direction ):
@@ -69,6 +280,155 @@ class GPIO_Device( object ):
         """
         RPi.GPIO.output( self.pin, value )
 
+    # ---------------------------------------------------------------------------------------------
+    def readHandle( self ):
+        """! Retrieve read handle with the pin bound, calling RPi.GPIO directly
+        @return  callable returning pin value
+        """
+        return functools.partial( RPi.GPIO.input, self.pin )
+
+    # ---------------------------------------------------------------------------------------------
+    def writeHandle( self ):
+        """! Retrieve write handle with the pin bound, calling RPi.GPIO directly
+        @return  callable taking pin value
+        """
+        return functools.partial( RPi.GPIO.output, self.pin )
+
+    # ---------------------------------------------------------------------------------------------
+    def setDebounce( self, settle_time, edge=Grove_Digital_Port_Edge.BOTH ):
+        """! Set debounce filtering of edge events
+        Edges within settle time of the last accepted edge, or that do not change the pin level,
+        are ignored.
+        @param settle_time  settle time (in s), 0 to disable
+        @param edge  edges passed to event handler and event queue
+        """
+        self.__settle_ns = int( settle_time * 1e9 )
+        self.__event_edge = edge
+        self.__event_level = self.EDGE_LEVELS[edge]
+
+        self.__last_edge = 0
+        self.__last_level = None
+
+        self.__update_event_detect()
+
+    # ---------------------------------------------------------------------------------------------
+    def enableCounting( self, edge=Grove_Digital_Port_Edge.RISING ):
+        """! Count edges
+        Counting alone runs no event handler and does not read the pin.
+        @param edge  edges to count
+        """
+        self.__count_edge = edge
+        self.__count_level = self.EDGE_LEVELS[edge]
+        self.resetCount()
+
+        self.__counting = True
+
+        self.__update_event_detect()
+
+    # ---------------------------------------------------------------------------------------------
+    def disableCounting( self ):
+        """! Stop counting edges """
+        self.__counting = False
+
+        self.__update_event_detect()
+
+    # ---------------------------------------------------------------------------------------------
+    def resetCount( self ):
+        """! Reset edge counter """
+        self.__count = 0
+        self.__count_first = 0
+        self.__count_last = 0
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def edgeCount( self ):
+        """! Retrieve number of edges counted
+        @return  edge count
+        """
+        return self.__count
+
+    # ---------------------------------------------------------------------------------------------
+    def edgeFrequency( self ):
+        """! Retrieve edge frequency over counted edges
+        @return  frequency (in Hz)
+        """
+        count = self.__count
+        elapsed = self.__count_last - self.__count_first
+
+        if (( count < 2 ) or ( elapsed <= 0 )):
+            return 0.0
+
+        return (count - 1) * 1e9 / elapsed
+
+    # ---------------------------------------------------------------------------------------------
+    def enableEventQueue( self, size=256, edge=Grove_Digital_Port_Edge.BOTH ):
+        """! Queue timestamped edge events
+        Events are captured in the edge callback and held until drained. When the queue is full
+        new events are dropped and counted.
+        @param size  maximum number of queued events
+        @param edge  edges to queue
+        """
+        self.__events_size = size
+        self.__events_edge = edge
+        self.__events_level = self.EDGE_LEVELS[edge]
+        self.__events_dropped = 0
+
+        self.__events = deque()
+
+        self.__update_event_detect()
+
+    # ---------------------------------------------------------------------------------------------
+    def disableEventQueue( self ):
+        """! Stop queueing edge events, discarding queued events """
+        self.__events = None
+
+        self.__update_event_detect()
+
+    # ---------------------------------------------------------------------------------------------
+    def drainEvents( self, limit=None ):
+        """! Remove queued edge events
+        @param limit  maximum number of events to remove, @c None for all
+        @return  list of (monotonic timestamp (in ns), pin value), oldest first
+        """
+        events = self.__events
+        result = []
+
+        if ( events is None ):
+            return result
+
+        if ( limit is None ):
+            limit = len( events )
+
+        try:
+            for i in range( 0, limit ):
+                result.append( events.popleft() )
+
+        except IndexError:
+            pass
+
+        return result
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def pendingEvents( self ):
+        """! Retrieve number of queued edge events
+        @return  number of events
+        """
+        events = self.__events
+
+        if ( events is None ):
+            return 0
+
+        return len( events )
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def droppedEvents( self ):
+        """! Retrieve number of edge events dropped because the queue was full
+        @return  number of events
+        """
+        return self.__events_dropped
+
     # ---------------------------------------------------------------------------------------------
     @property
     def on_event( self ):
@@ -86,7 +446,82 @@ class GPIO_Device( object ):
         if ( not callable( handle ) ):
             return
 
-        if ( self.__event_handle is None ):
-            RPi.GPIO.add_event_detect( self.pin, RPi.GPIO.BOTH, self.__on_event )
-
         self.__event_handle = handle
+
+        self.__update_event_detect()
+
+# =================================================================================================
+class GPIO_Port_Group( object ):
+    """! Group of GPIO pins read and written together as a bitmask
+
+    Bit @c i of a mask is the value of @c pins[i]. Writes go out as a single RPi.GPIO call using
+    its list forms.
+    """
+
+    # largest group with precomputed output patterns
+    PATTERN_PINS = 8
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self, pins, direction=None, backend=None ):
+        """! Initialize Device
+        @param pins  gpio pin numbers (BCM)
+        @param direction  port direction
+        @param backend  gpio backend, @c None for RPi.GPIO
+        """
+        if (( backend is None ) and ( RPi is None )):
+            raise ImportError( 'GPIO_Port_Group requires the RPi.GPIO module or a backend' )
+
+        self.pins = tuple( pins )
+        self.direction = None
+
+        self.__gpio = RPi.GPIO if backend is None else backend
+
+        # output values by mask
+        n = len( self.pins )
+
+        if ( n <= self.PATTERN_PINS ):
+            self.__patterns = tuple( tuple( (mask >> i) & 1 for i in range( 0, n ) ) for mask in range( 0, 1 << n ) )
+        else:
+            self.__patterns = None
+
+        if ( direction is not None ):
+            self.pinMode( direction )
+
+    # ---------------------------------------------------------------------------------------------
+    def pinMode( self, direction ):
+        """! Set direction of all pins
+        @param direction  port direction
+        """
+        self.direction = direction
+
+        self.__gpio.setup( list( self.pins ), GPIO_Device.PIN_DIRS[self.direction] )
+
+    # ---------------------------------------------------------------------------------------------
+    def read( self ):
+        """! Read pins
+        @return  pin values as bitmask
+        """
+        read = self.__gpio.input
+
+        mask = 0
+        bit = 1
+
+        for pin in self.pins:
+            if ( read( pin ) ):
+                mask |= bit
+
+            bit <<= 1
+
+        return mask
+
+    # ---------------------------------------------------------------------------------------------
+    def write( self, mask ):
+        """! Write pins
+        @param mask  pin values as bitmask
+        """
+        if ( self.__patterns is not None ):
+            values = self.__patterns[mask & (len( self.__patterns ) - 1)]
+        else:
+            values = tuple( (mask >> i) & 1 for i in range( 0, len( self.pins ) ) )
+
+        self.__gpio.output( self.pins, values )
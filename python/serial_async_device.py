@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/rblankley/rpi-grove/blob/master/LICENSE
+#
+
+from serial_device import Serial_Line_Framer
+
+import serial
+
+__all__ = ['Serial_Async_Device']
+
+# =================================================================================================
+class Serial_Async_Device( object ):
+    """! Serial communication driven by an asyncio event loop
+
+    The serial port is watched with @c loop.add_reader(); lines are framed and handed to the
+    process command handle on the event loop thread. No threads are created.
+    """
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self, port, baud, loop ):
+        """! Initialize Class
+        @param port  serial device
+        @param baud  baud rate
+        @param loop  asyncio event loop
+        """
+        self.__ser = serial.Serial( port, baud, timeout=0 )
+        self.__ser.flush()
+
+        self.__loop = loop
+        self.__framer = Serial_Line_Framer()
+
+        self.__process_command_handle = None
+        self.__capture = None
+
+        self.__reading = False
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def loop( self ):
+        """! Retrieve event loop
+        @return  event loop
+        """
+        return self.__loop
+
+    # ---------------------------------------------------------------------------------------------
+    def start( self ):
+        """! Start reading from the event loop """
+        if ( self.__reading ):
+            return
+
+        self.__loop.add_reader( self.__ser.fileno(), self.__on_readable )
+        self.__reading = True
+
+    # ---------------------------------------------------------------------------------------------
+    def stop( self ):
+        """! Stop reading """
+        if ( not self.__reading ):
+            return
+
+        self.__reading = False
+
+        if ( not self.__loop.is_closed() ):
+            self.__loop.remove_reader( self.__ser.fileno() )
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def on_process_command( self ):
+        """! Retrieve callback handle for process command
+        @return  handle
+        """
+        return self.__process_command_handle
+
+    # ---------------------------------------------------------------------------------------------
+    @on_process_command.setter
+    def on_process_command( self, handle ):
+        """! Set callback handle for process command
+        @param handle  callback handle
+        """
+        if not callable( handle ):
+            return
+
+        self.__process_command_handle = handle
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def capture( self ):
+        """! Retrieve raw data capture
+        @return  capture, @c None if not capturing
+        """
+        return self.__capture
+
+    # ---------------------------------------------------------------------------------------------
+    @capture.setter
+    def capture( self, capture ):
+        """! Set raw data capture; every read is handed to its write() method
+        @param capture  capture, @c None to stop capturing
+        """
+        self.__capture = capture
+
+    # ---------------------------------------------------------------------------------------------
+    def __on_readable( self ):
+        """! Serial port readable handler """
+        data = self.__ser.read( max( self.__ser.in_waiting, 1 ) )
+
+        if ( self.__capture is not None ):
+            self.__capture.write( data )
+
+        lines = self.__framer.feed( data )
+        handle = self.__process_command_handle
+
+        if ( callable( handle ) ):
+            for line in lines:
+                handle( line )
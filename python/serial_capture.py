@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Released under the MIT license (http://choosealicense.com/licenses/mit/).
+# For more information see https://github.com/rblankley/rpi-grove/blob/master/LICENSE
+#
+
+from collections import deque
+from enum import Enum
+from threading import Event, Thread
+
+import gzip
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+__all__ = ['Serial_Capture_Compression', 'Serial_Capture']
+
+# =================================================================================================
+class Serial_Capture_Compression( Enum ):
+    """! Serial Capture File Compression """
+    NONE, GZIP, ZSTD = range( 0, 3 )
+
+# =================================================================================================
+class Serial_Capture( Thread ):
+    """! Thread object that writes raw serial data to disk
+
+    The serial reader hands data to write(), which only appends to a bounded queue and never
+    blocks; when the queue is full the data is dropped and counted. The writer thread wakes once
+    per flush time or full batch, appends everything queued at once and rotates the capture file
+    by size and age.
+    """
+
+    # reads queued before the writer is woken ahead of the flush time
+    BATCH_SIZE = 64
+
+    EXTENSIONS = {
+        Serial_Capture_Compression.NONE: '',
+        Serial_Capture_Compression.GZIP: '.gz',
+        Serial_Capture_Compression.ZSTD: '.zst',
+    }
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self, path, compression=Serial_Capture_Compression.GZIP, max_bytes=16 << 20, max_age=3600.0, queue_size=4096, flush_time=1.0 ):
+        """! Initialize Class
+        @param path  capture file path prefix; files are named <path>.<yyyymmdd-hhmmss>.<n>[.gz|.zst]
+        @param compression  file compression
+        @param max_bytes  rotate after this many bytes written (uncompressed), 0 for no limit
+        @param max_age  rotate after this many seconds, 0 for no limit
+        @param queue_size  maximum number of reads waiting to be written
+        @param flush_time  longest time data waits before being written (in s)
+        """
+        super( Serial_Capture, self ).__init__()
+
+        # daemonize thread
+        self.daemon = True
+
+        if (( Serial_Capture_Compression.ZSTD == compression ) and ( zstandard is None )):
+            raise ValueError( 'zstd compression requires the zstandard module' )
+
+        if ( queue_size < 1 ):
+            raise ValueError( 'queue size must be at least 1' )
+
+        self.__path = path
+        self.__compression = compression
+        self.__max_bytes = max_bytes
+        self.__max_age = max_age
+        self.__flush_time = flush_time
+
+        # capture queue; deque append and popleft are thread safe
+        self.__queue = deque()
+        self.__queue_size = queue_size
+        self.__ready = Event()
+        self.__quit = Event()
+
+        self.__file = None
+        self.__files = []
+        self.__sequence = 0
+        self.__opened = 0.0
+        self.__written = 0
+
+        self.__bytes = 0
+        self.__dropped = 0
+
+    # ---------------------------------------------------------------------------------------------
+    def stop( self ):
+        """! Stop thread and wait for completion
+        Data already queued is written first.
+        """
+        self.__quit.set()
+        self.__ready.set()
+        self.join()
+
+    # ---------------------------------------------------------------------------------------------
+    def write( self, data ):
+        """! Queue data for capture; called from the serial reader, never blocks
+        @param data  bytes received
+        """
+        queue = self.__queue
+
+        if ( self.__queue_size <= len( queue ) ):
+            self.__dropped += 1
+            return
+
+        queue.append( data )
+
+        # wake writer early only for a full batch
+        if (( self.BATCH_SIZE <= len( queue ) ) and ( not self.__ready.is_set() )):
+            self.__ready.set()
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def bytesWritten( self ):
+        """! Retrieve number of bytes captured
+        @return  number of bytes (uncompressed)
+        """
+        return self.__bytes
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def dropped( self ):
+        """! Retrieve number of reads dropped because the queue was full
+        @return  number of reads
+        """
+        return self.__dropped
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def files( self ):
+        """! Retrieve capture files written
+        @return  tuple of file names
+        """
+        return tuple( self.__files )
+
+    # ---------------------------------------------------------------------------------------------
+    def __open( self ):
+        """! Open new capture file """
+        name = '{0}.{1}.{2}{3}'.format( self.__path, time.strftime( '%Y%m%d-%H%M%S', time.gmtime() ), self.__sequence, self.EXTENSIONS[self.__compression] )
+
+        if ( Serial_Capture_Compression.GZIP == self.__compression ):
+            self.__file = gzip.open( name, 'wb' )
+        elif ( Serial_Capture_Compression.ZSTD == self.__compression ):
+            self.__file = zstandard.ZstdCompressor().stream_writer( open( name, 'wb' ) )
+        else:
+            self.__file = open( name, 'wb' )
+
+        self.__files.append( name )
+        self.__sequence += 1
+        self.__opened = time.monotonic()
+        self.__written = 0
+
+    # ---------------------------------------------------------------------------------------------
+    def __close( self ):
+        """! Close capture file """
+        if ( self.__file is not None ):
+            self.__file.close()
+            self.__file = None
+
+    # ---------------------------------------------------------------------------------------------
+    def __rotate( self ):
+        """! Close capture file when too large or too old """
+        if ( self.__file is None ):
+            return
+
+        if (( 0 < self.__max_bytes ) and ( self.__max_bytes <= self.__written )):
+            self.__close()
+
+        elif (( 0 < self.__max_age ) and ( self.__max_age <= ( time.monotonic() - self.__opened ) )):
+            self.__close()
+
+    # ---------------------------------------------------------------------------------------------
+    def run( self ):
+        """! Thread run method """
+        queue = self.__queue
+
+        try:
+            while ( True ):
+                self.__ready.wait( self.__flush_time )
+                self.__ready.clear()
+
+                # checked after waking so stop() does not wait another flush time; writes queued
+                # before stop() are drained below
+                stopping = self.__quit.is_set()
+
+                # batch everything queued so far into one append
+                n = len( queue )
+
+                if ( n ):
+                    data = b''.join( [queue.popleft() for i in range( 0, n )] )
+
+                    if ( self.__file is None ):
+                        self.__open()
+
+                    self.__file.write( data )
+                    self.__file.flush()
+
+                    self.__written += len( data )
+                    self.__bytes += len( data )
+
+                if ( stopping ):
+                    break
+
+                self.__rotate()
+
+        finally:
+            self.__close()
+
+
+# =================================================================================================
+#
+# Test Cases
+#
+# =================================================================================================
+
+# -------------------------------------------------------------------------------------------------
+def main():
+    import os
+    import tempfile
+
+    sentence = b'$GPGGA,064951.000,2307.1256,N,12016.4438,E,1,8,0.95,39.9,M,17.8,M,,*63\r\n'
+    reads = 100000
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join( directory, 'capture.nmea' )
+
+        # write from reader directly
+        start = time.perf_counter()
+
+        with open( path, 'ab' ) as f:
+            for i in range( 0, reads ):
+                f.write( sentence )
+                f.flush()
+
+        before = (time.perf_counter() - start) / reads
+
+        # write through capture thread
+        compressions = [Serial_Capture_Compression.NONE, Serial_Capture_Compression.GZIP]
+
+        if ( zstandard is not None ):
+            compressions.append( Serial_Capture_Compression.ZSTD )
+
+        for compression in compressions:
+            capture = Serial_Capture( path, compression, max_bytes=1 << 20, queue_size=reads )
+            capture.start()
+
+            start = time.perf_counter()
+
+            for i in range( 0, reads ):
+                capture.write( sentence )
+
+            after = (time.perf_counter() - start) / reads
+
+            capture.stop()
+
+            size = sum( os.path.getsize( name ) for name in capture.files )
+
+            print( '{0}: reader {1:.2f} us per write (direct {2:.2f} us), {3} files, {4} bytes, {5} dropped'.format(
+                compression.name, after * 1e6, before * 1e6, len( capture.files ), size, capture.dropped ) )
+
+# -------------------------------------------------------------------------------------------------
+if __name__ == "__main__":
+    main()
@@ -5,31 +5,116 @@
 # For more information see https://github.com/rblankley/rpi-grove/blob/master/LICENSE
 #
 
-from threading import Lock, Thread
+from collections import deque
+from enum import Enum
+from threading import Condition, Lock, Thread
 
+import os
+import select
 import serial
 import time
+import traceback
 
-__all__ = ['Serial_Device']
+__all__ = ['Serial_Overflow_Policy', 'Serial_Line_Framer', 'Serial_Device']
+
+# =================================================================================================
+class Serial_Overflow_Policy( Enum ):
+    """! Serial Line Queue Overflow Policies """
+    DROP_NEWEST, DROP_OLDEST, BLOCK = range( 0, 3 )
+
+# =================================================================================================
+class Serial_Line_Framer( object ):
+    """! Splits a byte stream into lines
+
+    Bytes are appended to one buffer and searched for line feeds; each complete line is decoded
+    once. Partial lines stay in the buffer until the rest arrives.
+    """
+
+    # ---------------------------------------------------------------------------------------------
+    def __init__( self, encoding='utf-8' ):
+        """! Initialize Class
+        @param encoding  line encoding
+        """
+        self.__buffer = bytearray()
+        self.__encoding = encoding
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def pending( self ):
+        """! Retrieve number of buffered bytes of partial line
+        @return  number of bytes
+        """
+        return len( self.__buffer )
+
+    # ---------------------------------------------------------------------------------------------
+    def feed( self, data ):
+        """! Add data
+        @param data  bytes received
+        @return  list of complete, non-empty lines without line feed
+        """
+        buffer = self.__buffer
+        searched = len( buffer )
+
+        buffer += data
+
+        # partial line only
+        pos = buffer.find( b'\n', searched )
+
+        if ( pos < 0 ):
+            return []
+
+        encoding = self.__encoding
+
+        lines = []
+        start = 0
+
+        with memoryview( buffer ) as view:
+            while ( 0 <= pos ):
+                if ( start < pos ):
+                    lines.append( str( view[start:pos], encoding, 'replace' ) )
+
+                start = pos + 1
+                pos = buffer.find( b'\n', start )
+
+        # drop consumed lines; bytearray trims the front without moving the rest
+        del buffer[:start]
+
+        return lines
+
+    # ---------------------------------------------------------------------------------------------
+    def reset( self ):
+        """! Discard partial line """
+        del self.__buffer[:]
 
 # =================================================================================================
 class Serial_Device( Thread ):
-    """! Thread object that manages serial communication """
+    """! Thread object that manages serial communication
+
+    The reader thread frames lines into a bounded queue; a consumer thread dispatches them to the
+    process command handle, so slow handlers do not stall the serial port.
+    """
 
     POLL_TIME = 0.05
 
     # ---------------------------------------------------------------------------------------------
-    def __init__( self, port, baud, timeout=0 ):
+    def __init__( self, port, baud, timeout=0, blocking=True, queue_size=64, overflow=Serial_Overflow_Policy.DROP_OLDEST ):
         """! Initialize Class
         @param port  serial device
         @param baud  baud rate
         @param timeout  timeout
+        @param blocking  @c True to block on the serial port until data arrives, @c False to poll
+                         every @c POLL_TIME (used when the port has no file descriptor)
+        @param queue_size  maximum number of lines waiting for dispatch
+        @param overflow  what to do with a line when the queue is full
         """
         super( Serial_Device, self ).__init__()
-        
+
         # daemonize thread
         self.daemon = True
 
+        if ( queue_size < 1 ):
+            raise ValueError( 'queue size must be at least 1' )
+
         self.__ser = serial.Serial( port, baud, timeout=timeout )
         self.__ser.flush()
 
@@ -39,15 +124,107 @@ class Serial_Device( Thread ):
 
         self.__process_command_handle = None
 
+        self.__framer = Serial_Line_Framer()
+        self.__wakeups = 0
+
+        self.__capture = None
+
+        # pipe used to wake blocked reader on stop
+        if ( blocking and hasattr( self.__ser, 'fileno' ) and hasattr( os, 'pipe' ) ):
+            self.__stop_pipe = os.pipe()
+        else:
+            self.__stop_pipe = None
+
+        # line queue
+        self.__queue = deque()
+        self.__queue_cond = Condition( Lock() )
+        self.__queue_size = queue_size
+        self.__queue_closed = False
+        self.__overflow = overflow
+        self.__dropped = 0
+        self.__max_depth = 0
+        self.__handler_errors = 0
+
+        self.__consumer = Thread( target=self.__dispatch )
+        self.__consumer.daemon = True
+
+    # ---------------------------------------------------------------------------------------------
+    def start( self ):
+        """! Start reader and consumer threads """
+        self.__consumer.start()
+        super( Serial_Device, self ).start()
+
     # ---------------------------------------------------------------------------------------------
     def stop( self ):
-        """! Stop thread and wait for completion """
+        """! Stop threads and wait for completion
+        Lines already queued are dispatched first.
+        """
         self.__lock.acquire()
         self.__quit = True
         self.__lock.release()
 
+        if ( self.__stop_pipe is not None ):
+            os.write( self.__stop_pipe[1], b'\0' )
+
+        # release reader blocked on a full queue
+        with self.__queue_cond:
+            self.__queue_cond.notify_all()
+
         self.join()
 
+        with self.__queue_cond:
+            self.__queue_closed = True
+            self.__queue_cond.notify_all()
+
+        if ( self.__consumer.is_alive() ):
+            self.__consumer.join()
+
+        if ( self.__stop_pipe is not None ):
+            for fd in self.__stop_pipe:
+                os.close( fd )
+
+            self.__stop_pipe = None
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def wakeups( self ):
+        """! Retrieve number of reader thread wakeups
+        @return  number of wakeups
+        """
+        return self.__wakeups
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def queueDepth( self ):
+        """! Retrieve number of lines waiting for dispatch
+        @return  number of lines
+        """
+        return len( self.__queue )
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def maxQueueDepth( self ):
+        """! Retrieve largest number of lines that waited for dispatch
+        @return  number of lines
+        """
+        return self.__max_depth
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def droppedLines( self ):
+        """! Retrieve number of lines dropped because the queue was full
+        @return  number of lines
+        """
+        return self.__dropped
+
+    # ---------------------------------------------------------------------------------------------
+    @property
+    def handlerErrors( self ):
+        """! Retrieve number of lines whose process command handle raised an exception
+        @return  number of lines
+        """
+        return self.__handler_errors
+
     # ---------------------------------------------------------------------------------------------
     @property
     def on_process_command( self ):
@@ -74,50 +251,229 @@ class Serial_Device( Thread ):
         self.__lock.release()
 
     # ---------------------------------------------------------------------------------------------
-    def run( self ):
-        """! Thread run method """
-        buffer = []
+    @property
+    def capture( self ):
+        """! Retrieve raw data capture
+        @return  capture, @c None if not capturing
+        """
+        return self.__capture
 
-        while ( True ):
-            self.__lock.acquire()
+    # ---------------------------------------------------------------------------------------------
+    @capture.setter
+    def capture( self, capture ):
+        """! Set raw data capture; the reader hands every read to its write() method
+        @param capture  capture, @c None to stop capturing
+        """
+        self.__capture = capture
 
-            handle = self.__process_command_handle
-            commands = []
+    # ---------------------------------------------------------------------------------------------
+    def __enqueue( self, lines ):
+        """! Queue lines for dispatch
+        @param lines  lines to queue
+        """
+        queue = self.__queue
+        size = self.__queue_size
 
-            try:
-                
-                # check to exit thread
-                if ( self.__quit ):
-                    self.__quit = False
-                    break
+        with self.__queue_cond:
+            for line in lines:
+                if ( size <= len( queue ) ):
+                    if ( Serial_Overflow_Policy.DROP_NEWEST == self.__overflow ):
+                        self.__dropped += 1
+                        continue
 
-                # read serial port
-                pending = self.__ser.inWaiting()
+                    elif ( Serial_Overflow_Policy.DROP_OLDEST == self.__overflow ):
+                        queue.popleft()
+                        self.__dropped += 1
 
-                if ( 0 != pending ):
-                    for c in self.__ser.read( pending ):
-                        ch = c.decode( 'utf-8' )
+                    else:
+                        while (( size <= len( queue ) ) and ( not self.__quit )):
+                            self.__queue_cond.wait()
 
-                        if ( ch != '\n' ):
-                            buffer.append( ch )
+                queue.append( line )
 
-                        # process buffer when we see line feed
-                        else:
-                            line = ''.join( str(v) for v in buffer )
-                            line.strip()
+            if ( self.__max_depth < len( queue ) ):
+                self.__max_depth = len( queue )
 
-                            if ( len( line ) ):
-                                commands.append( line )
+            self.__queue_cond.notify_all()
 
-                            buffer = []
+    # ---------------------------------------------------------------------------------------------
+    def __dispatch( self ):
+        """! Consumer thread run method """
+        queue = self.__queue
 
-            finally:
-                self.__lock.release()
+        while ( True ):
+            with self.__queue_cond:
+                while (( not queue ) and ( not self.__queue_closed )):
+                    self.__queue_cond.wait()
+
+                if ( not queue ):
+                    break
+
+                lines = list( queue )
+                queue.clear()
+
+                # release reader blocked on a full queue
+                self.__queue_cond.notify_all()
+
+            handle = self.on_process_command
 
-            # process all commands
             if ( callable( handle ) ):
-                for command in commands:
-                    handle( command )
+                for line in lines:
+
+                    # a failing line must not stop dispatch of later lines
+                    try:
+                        handle( line )
+
+                    except Exception:
+                        self.__handler_errors += 1
+                        traceback.print_exc()
 
-            # sleep until next polling time
+    # ---------------------------------------------------------------------------------------------
+    def __wait( self ):
+        """! Wait until serial data may be available """
+        if ( self.__stop_pipe is None ):
             time.sleep( self.POLL_TIME )
+            return
+
+        select.select( (self.__ser.fileno(), self.__stop_pipe[0]), (), () )
+
+    # ---------------------------------------------------------------------------------------------
+    def run( self ):
+        """! Thread run method """
+        while ( not self.__quit ):
+            self.__wakeups += 1
+
+            # read serial port
+            pending = self.__ser.inWaiting()
+
+            if ( 0 != pending ):
+                data = self.__ser.read( pending )
+
+                capture = self.__capture
+
+                if ( capture is not None ):
+                    capture.write( data )
+
+                lines = self.__framer.feed( data )
+
+                if ( lines ):
+                    self.__enqueue( lines )
+
+            # wait for more data
+            self.__wait()
+
+
+# =================================================================================================
+#
+# Test Cases
+#
+# =================================================================================================
+
+# -------------------------------------------------------------------------------------------------
+def measure( blocking, lines=50, idle=1.0 ):
+    """! Measure reader wakeups and line latency against a pty fake serial port
+    @param blocking  reader mode
+    @param lines  number of lines to send
+    @param idle  idle time (in s)
+    @return  measurement as (idle wakeups per second, average line latency (in s), max line latency (in s))
+    """
+    import pty
+
+    (master, slave) = pty.openpty()
+
+    dev = Serial_Device( os.ttyname( slave ), 115200, blocking=blocking )
+
+    received = []
+    dev.on_process_command = lambda line: received.append( time.perf_counter() )
+    dev.start()
+
+    # idle wakeups
+    time.sleep( 0.1 )
+    start = dev.wakeups
+    time.sleep( idle )
+    idle_rate = (dev.wakeups - start) / idle
+
+    # line latency
+    latency = []
+
+    for i in range( 0, lines ):
+        del received[:]
+
+        sent = time.perf_counter()
+        os.write( master, b'$GPGGA,000000.000,0000.00000,N,00000.00000,E,0,0,0.0,0.0,M,0.0,M,,*00\r\n' )
+
+        while ( not received ):
+            time.sleep( 0.0001 )
+
+        latency.append( received[0] - sent )
+        time.sleep( 0.01 )
+
+    dev.stop()
+
+    os.close( master )
+    os.close( slave )
+
+    return (idle_rate, sum( latency ) / len( latency ), max( latency ))
+
+# -------------------------------------------------------------------------------------------------
+def measure_framing( chunk, size=4 * 1024 * 1024 ):
+    """! Measure line framing CPU time
+    @param chunk  bytes per read
+    @param size  bytes of NMEA data to frame
+    @return  measurement as (CPU time per MB for per-character framing (in s), CPU time per MB for Serial_Line_Framer (in s))
+    """
+    sentence = b'$GPGGA,064951.000,2307.1256,N,12016.4438,E,1,8,0.95,39.9,M,17.8,M,,*63\r\n'
+    data = sentence * (size // len( sentence ))
+    chunks = [data[i:i + chunk] for i in range( 0, len( data ), chunk )]
+
+    megabytes = len( data ) / (1024.0 * 1024.0)
+
+    # per-character framing
+    start = time.process_time()
+    buffer = []
+    count = 0
+
+    for d in chunks:
+        for ch in d.decode( 'utf-8', 'replace' ):
+            if ( ch != '\n' ):
+                buffer.append( ch )
+            else:
+                line = ''.join( str(v) for v in buffer )
+
+                if ( len( line ) ):
+                    count += 1
+
+                buffer = []
+
+    before = (time.process_time() - start) / megabytes
+
+    # framer
+    start = time.process_time()
+    framer = Serial_Line_Framer()
+
+    for d in chunks:
+        framer.feed( d )
+
+    after = (time.process_time() - start) / megabytes
+
+    return (before, after)
+
+# -------------------------------------------------------------------------------------------------
+def main():
+    for chunk in (16, 256, 4096):
+        (before, after) = measure_framing( chunk )
+
+        print( 'framing {0} byte reads: per-character {1:.3f} s/MB, framer {2:.3f} s/MB'.format( chunk, before, after ) )
+
+        # serial line rate is ~10 bits per byte
+        for baud in (115200, 921600, 3000000):
+            rate = baud / 10.0 / (1024.0 * 1024.0)
+            print( '    {0} baud: per-character {1:.2f}% cpu, framer {2:.2f}% cpu'.format( baud, before * rate * 100.0, after * rate * 100.0 ) )
+
+    for blocking in (False, True):
+        (wakeups, average, worst) = measure( blocking )
+        print( '{0}: {1:.1f} idle wakeups/s, line latency avg {2:.3f} ms max {3:.3f} ms'.format( 'blocking' if blocking else 'polling', wakeups, average * 1000.0, worst * 1000.0 ) )
+
+# -------------------------------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()